@@ -0,0 +1,120 @@
+# Decode time and retained memory of the API models vs keeping the raw dicts around.
+# Usage: python benchmarks/bench_models.py [--submissions N] [--rows N] [--repeat N]
+# Every model is checked to round-trip through to_dict first.
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tabulate import tabulate
+
+from sort_me.types import (
+    BaseSubmission, ContestInfoNew, ContestTableRow, ContestTask, ShortSubmission, SubmissionHistory, UpcomingContest,
+    VerboseContestInfo, VerboseSubmission,
+)
+
+from fake_server import FakeSortMe, ServerOptions
+
+
+def make_history(n: int) -> str:
+    verdicts = [(1, 'Полное решение', 100), (2, 'Неправильный ответ', 0), (3, 'Превышено время', 40)]
+    submissions = []
+    for i in range(n):
+        verdict, text, points = verdicts[i % len(verdicts)]
+        submission = {'id': 1_000_000 - i, 'shown_verdict': verdict, 'shown_verdict_text': text, 'total_points': points}
+        if verdict != 1:
+            submission['shown_test'] = i % 50 + 1
+        submissions.append(submission)
+    return json.dumps({'count': n, 'submissions': submissions})
+
+
+def make_table(n: int, tasks: int = 10) -> str:
+    rows = [{'place': i + 1, 'results': [[(i * 7 + t) % 101, i * 13 % 18000] for t in range(tasks)], 'sum': i, 'time': i * 60} for i in range(n)]
+    return json.dumps({'table': rows})
+
+
+def check_round_trip():
+    # `Model.from_dict(model.to_dict()) == model` for every model, on the payloads of the fake server plus the parts
+    # of a verdict it never sends (subtasks with failed tests)
+    api = FakeSortMe(ServerOptions())
+    failed_tests = [{'n': 3, 'verdict': 2, 'verdict_text': 'Неправильный ответ', 'milliseconds': 15, 'partial_score': 0}]
+    subtasks = [
+        {'skipped': False, 'points': 40, 'worst_time': 120, 'failed_tests': None},
+        {'skipped': False, 'points': 0, 'worst_time': 15, 'failed_tests': failed_tests},
+        {'skipped': True, 'points': 0, 'worst_time': 0},
+    ]
+    tasks = {**api.contest(301), 'status': 'running', 'tasks': [api.task(301, idx) for idx in range(3)]}
+    verbose = api.get('getSubmissionInfo', {'id': '10000002'})[1]
+
+    models = [
+        *[ContestTask.from_dict(task) for task in tasks['tasks']],
+        ContestTask.from_dict({**api.task(301, 0), 'comment': 'Примечание', 'rating_system': 1}),
+        VerboseContestInfo.from_dict(api.contest(301)),
+        VerboseContestInfo.from_dict({key: value for key, value in api.contest(301).items() if key != 'now'}),
+        *[UpcomingContest.from_dict(contest) for contest in api.get('GetUpcomingContests', {})[1]],
+        ContestInfoNew.from_dict({**tasks, 'you': api.row(5)}),
+        SubmissionHistory.from_dict(api.get('getMySubmissionsByTask', {'id': '30100'})[1]),
+        ContestTableRow.from_dict(api.row(1)),
+        VerboseSubmission.from_dict(verbose),
+        VerboseSubmission.from_dict({**verbose, 'subtasks': subtasks}),
+        BaseSubmission.from_dict({'completed': False, 'shown_verdict': 1, 'shown_verdict_text': 'Тестируется', 'subtasks': subtasks}),
+    ]
+    for model in models:
+        assert type(model).from_dict(model.to_dict()) == model, f'{type(model).__name__} does not round-trip: {model}'
+
+    raw = json.loads(make_history(1000))['submissions']
+    assert [s.to_dict() for s in ShortSubmission.from_list(raw)] == raw
+
+
+def best_of(repeat: int, func) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def retained(func) -> int:
+    gc.collect()
+    tracemalloc.start()
+    obj = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del obj
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--submissions', type=int, default=100_000)
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    history = make_history(args.submissions)
+    table = make_table(args.rows)
+
+    cases = [
+        (f'history, {args.submissions} submissions', 'dicts', lambda: json.loads(history)['submissions']),
+        (f'history, {args.submissions} submissions', 'models', lambda: SubmissionHistory.from_dict(json.loads(history)).submissions),
+        (f'standings, {args.rows} rows', 'dicts', lambda: json.loads(table)['table']),
+        (f'standings, {args.rows} rows', 'models', lambda: ContestTableRow.from_list(json.loads(table)['table'])),
+    ]
+
+    check_round_trip() # decoding doesn't lose anything
+
+    rows = []
+    for payload, kind, func in cases:
+        rows.append([payload, kind, f'{best_of(args.repeat, func) * 1000:.1f}', f'{retained(func) / 1024 / 1024:.1f}'])
+
+    print(tabulate(rows, headers=['Payload', 'Kept as', 'Decode, ms', 'Memory, MiB'], tablefmt='rounded_grid'))
+
+
+if __name__ == '__main__':
+    main()
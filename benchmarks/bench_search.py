@@ -0,0 +1,94 @@
+# Indexing and query time of `sm search` on a synthetic archive of statements.
+# Usage: python benchmarks/bench_search.py [--contests N] [--tasks N] [--repeat N]
+# The stemmer is checked to bring the forms of a word together first.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tabulate import tabulate
+
+from sort_me.search import SearchIndex, snippet, tokenize
+from sort_me.types import ContestTask
+
+from fake_server import FakeSortMe, ServerOptions
+
+WORDS = (
+    'дерево отрезков деревья отрезками граф графа вершина вершин ребро рёбер кратчайший путь путей массив массива сумма суммы '
+    'запрос запросов минимум строка строк подстрока палиндром динамика рюкзак число чисел отрезок дерева'
+).split()
+
+SAME_TOKEN = [
+    ['отрезок', 'отрезка', 'отрезков', 'отрезками', 'отрезке'],
+    ['дерево', 'дерева', 'деревья', 'деревьев'],
+    ['число', 'числа', 'чисел'],
+    ['вершина', 'вершины', 'вершин', 'вершинами'],
+    ['ребро', 'ребра', 'рёбра'],
+    ['кратчайший', 'кратчайшего', 'кратчайшие'],
+    ['строка', 'строки', 'строк'],
+]
+
+
+def check_stemming():
+    for forms in SAME_TOKEN:
+        tokens = {form: tokenize(form)[0] for form in forms}
+        assert len(set(tokens.values())) == 1, f'forms of a word end up as different tokens: {tokens}'
+
+
+def make_index(path: str, contests: int, tasks: int) -> SearchIndex:
+    api = FakeSortMe(ServerOptions())
+    rng = random.Random(0)
+    index = SearchIndex(path)
+    for contest_id in range(contests):
+        statements = []
+        for idx in range(tasks):
+            task = api.task(contest_id, idx)
+            task['main_description'] = ' '.join(rng.choice(WORDS) for _ in range(300)) + ' $1 \\leq n \\leq 10^5$.'
+            statements.append(ContestTask.from_dict(task))
+        index.add_tasks(contest_id, statements)
+    return index
+
+
+def best_of(repeat: int, func) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--contests', type=int, default=300)
+    parser.add_argument('--tasks', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    check_stemming()
+
+    with tempfile.TemporaryDirectory(prefix='sortme-bench-') as tmp:
+        start = time.perf_counter()
+        index = make_index(os.path.join(tmp, 'search.sqlite3'), args.contests, args.tasks)
+        build = time.perf_counter() - start
+
+        results = index.search('отрезок')
+        assert results and all('отрез' in result.text for result in results), 'a search for "отрезок" misses "отрезков"'
+
+        rows = [[f'index {args.contests * args.tasks} statements', f'{build * 1000:.1f}']]
+        for query in ('отрезок', 'дерево отрезков', 'кратчайший путь в графе', 'выведите сумму'):
+            def run():
+                for result in index.search(query):
+                    snippet(result.text, query)
+            rows.append([f'"{query}" + snippets', f'{best_of(args.repeat, run) * 1000:.1f}'])
+        index.close()
+
+    print(tabulate(rows, headers=['', 'ms'], tablefmt='rounded_grid'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+# Local stand-in for api.sort-me.org: the HTTP endpoints SortMeAPI uses plus the ws/submission websocket.
+# Usage: python benchmarks/fake_server.py [--latency 50] [--rate-limit-every 5] [--history 1000] [--standings 10000]
+# then point the CLI at it with SORTME_API_URL=http://127.0.0.1:PORT SORTME_WS_URL=ws://127.0.0.1:WS_PORT
+import argparse
+import itertools
+import json
+import socket
+import threading
+import time
+
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import websockets.sync.server
+
+PAGE_SIZE = 10 # getMySubmissionsByTask is paginated by 10, like the real thing
+
+
+@dataclass
+class ServerOptions:
+    latency: float = 0.0 # seconds added to every response
+    rate_limit_every: int = 0 # answer every Nth request with 429, 0 disables
+    tasks: int = 8
+    history: int = 30 # submissions per task
+    standings: int = 100 # rows in the contest table
+    tests: int = 20 # progress messages sent over the websocket before the verdict
+    ws_interval: float = 0.0 # seconds between websocket messages
+    ws_drop_after: int = 0 # cut the websocket after this many messages, 0 disables
+    ws_drops: int = 1 # how many connections per submission get cut
+    starts_in: float = -3600 # seconds from the server start to the contest start, tasks are hidden until then
+
+
+VERDICTS = [(1, 'Полное решение', 100), (2, 'Неправильный ответ', 0), (3, 'Превышено время', 40)]
+
+
+class FakeSortMe:
+    options: ServerOptions
+    _counter: itertools.count
+    _submission_ids: itertools.count
+    _lock: threading.Lock
+    _drops: dict[str, int]
+    started_at: float
+
+    def __init__(self, options: ServerOptions):
+        self.options = options
+        self._counter = itertools.count(1)
+        self._submission_ids = itertools.count(10_000_000)
+        self._lock = threading.Lock()
+        self._drops = {}
+        self.started_at = time.time()
+
+    def rate_limited(self) -> bool:
+        with self._lock:
+            n = next(self._counter)
+        return bool(self.options.rate_limit_every) and n % self.options.rate_limit_every == 0
+
+    def task(self, contest_id: int, idx: int) -> dict:
+        return {
+            'id': contest_id * 100 + idx,
+            'name': f'Задача {chr(ord("A") + idx)}',
+            'main_description': 'Даны два числа $a$ и $b$, $1 \\leq a, b \\leq 10^9$. Выведите их сумму.\n\n' * 5,
+            'in_description': 'В единственной строке даны числа $a$ и $b$.',
+            'out_description': 'Выведите $a + b$.',
+            'category': 0,
+            'difficulty': idx,
+            'solved_by': 1000 - idx * 100,
+            'samples': [{'in': '1 2', 'out': '3'}, {'in': '40 2', 'out': '42'}],
+            'on_moderation': False,
+            'visibility': 1,
+            'is_admin': False,
+            'admins': [],
+            'tests_updated': 1_700_000_000,
+            'time_limit_milliseconds': 1000,
+            'memory_limit_megabytes': 256,
+            'rating_system_type': 0,
+            'subtasks': [{'num': 1, 'points': 100, 'description': 'Без дополнительных ограничений', 'subtask_rating_system': 0, 'tests_count': self.options.tests}],
+        }
+
+    def contest(self, contest_id: int) -> dict:
+        now = int(time.time())
+        starts = int(self.started_at + self.options.starts_in)
+        return {
+            'id': contest_id,
+            'name': f'Контест №{contest_id}',
+            'starts': starts,
+            'ends': starts + 7200,
+            'now': now,
+            'description': '',
+            'register_starts': now - 7200,
+            'register_ends': now + 3600,
+            'participants_count': self.options.standings,
+            'rules': '',
+            'registered': True,
+            'is_admin': False,
+        }
+
+    def submission(self, submission_id: int) -> dict:
+        verdict, text, points = VERDICTS[submission_id % len(VERDICTS)]
+        out = {'id': submission_id, 'shown_verdict': verdict, 'shown_verdict_text': text, 'total_points': points}
+        if verdict != 1:
+            out['shown_test'] = submission_id % self.options.tests + 1
+        return out
+
+    def row(self, place: int) -> dict:
+        return {'place': place, 'results': [[(place * 7 + t) % 101, place * 13 % 18000] for t in range(self.options.tasks)], 'sum': place, 'time': place * 60}
+
+    def get(self, method: str, params: dict[str, str]) -> tuple[int, object]:
+        if method == 'getContestTasks':
+            contest_id = int(params['id'])
+            if time.time() < self.started_at + self.options.starts_in:
+                return 403, {'error': 'contest has not started yet'}
+            return 200, {
+                **self.contest(contest_id),
+                'status': 'running',
+                'tasks': [self.task(contest_id, idx) for idx in range(self.options.tasks)],
+            }
+
+        if method == 'getContestById':
+            return 200, self.contest(int(params['id']))
+
+        if method == 'GetUpcomingContests':
+            return 200, [{'id': 300 + i, 'name': f'Контест №{300 + i}', 'starts': 0, 'ends': 0, 'org_name': '', 'running': True, 'registration_opened': True, 'ended': False} for i in range(3)]
+
+        if method == 'getHistoryOfContests':
+            return 200, {'contests': [self.contest(200 + i) for i in range(20)]}
+
+        if method == 'getContestTable':
+            rows = [self.row(place) for place in range(1, self.options.standings + 1)]
+            return 200, {'you': rows[len(rows) // 2] if rows else self.row(1), 'table': rows}
+
+        if method == 'getMySubmissionsByTask':
+            newest = int(params['id']) * 100_000 + self.options.history
+            offset = int(params.get('offset', newest + 1))
+            ids = range(min(offset - 1, newest), newest - self.options.history, -1)[:PAGE_SIZE]
+            return 200, {'count': self.options.history, 'submissions': [self.submission(i) for i in ids]}
+
+        if method == 'getSubmissionInfo':
+            submission_id = int(params['id'])
+            return 200, {**self.submission(submission_id), 'completed': True, 'compiler_log': '', 'subtasks': None, 'code': '#include <iostream>\nint main() {}\n', 'submited_at': int(time.time())}
+
+        return 404, {'error': f'unknown method {method}'}
+
+    def post(self, method: str, body: dict) -> tuple[int, object]:
+        if method == 'submit':
+            if not body.get('code'):
+                return 400, {'error': 'empty code'}
+            return 200, {'id': next(self._submission_ids)}
+
+        return 404, {'error': f'unknown method {method}'}
+
+    def verdict_stream(self, websocket):
+        submission_id = parse_qs(urlparse(websocket.request.path).query).get('id', [''])[-1]
+        with self._lock:
+            drop = bool(self.options.ws_drop_after) and self._drops.get(submission_id, 0) < self.options.ws_drops
+            if drop:
+                self._drops[submission_id] = self._drops.get(submission_id, 0) + 1
+
+        for test in range(1, self.options.tests + 1):
+            if drop and test > self.options.ws_drop_after: # flaky Wi-Fi: no close frame, just gone
+                websocket.socket.shutdown(socket.SHUT_RDWR)
+                return
+            websocket.send(str(test))
+            if self.options.ws_interval:
+                time.sleep(self.options.ws_interval)
+        websocket.send(json.dumps({'completed': True, 'compiler_log': '', 'shown_verdict': 1, 'shown_verdict_text': 'Полное решение', 'total_points': 100, 'subtasks': None}))
+
+
+def make_handler(api: FakeSortMe) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1' # keep-alive, so connection pooling is measured too
+        disable_nagle_algorithm = True # headers and body go out in separate writes, don't wait on a delayed ACK
+
+        def log_message(self, *_):
+            pass
+
+        def _respond(self, status: int, payload: object):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self, handler):
+            if api.options.latency:
+                time.sleep(api.options.latency)
+            if api.rate_limited():
+                self._respond(429, {'error': 'too many requests'})
+                return
+            self._respond(*handler())
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: value[-1] for key, value in parse_qs(url.query).items()}
+            self._handle(lambda: api.get(url.path.strip('/'), params))
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            self._handle(lambda: api.post(url.path.strip('/'), body))
+
+    return Handler
+
+
+class FakeServer:
+    api: FakeSortMe
+    _http: ThreadingHTTPServer
+    _ws: websockets.sync.server.Server
+    _threads: list[threading.Thread]
+
+    def __init__(self, options: ServerOptions, host: str = '127.0.0.1', port: int = 0, ws_port: int = 0):
+        self.api = FakeSortMe(options)
+        self._http = ThreadingHTTPServer((host, port), make_handler(self.api))
+        self._http.daemon_threads = True
+        self._ws = websockets.sync.server.serve(self.api.verdict_stream, host, ws_port)
+        self._threads = []
+
+    @property
+    def api_url(self) -> str:
+        host, port = self._http.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def ws_url(self) -> str:
+        host, port = self._ws.socket.getsockname()[:2]
+        return f'ws://{host}:{port}'
+
+    def env(self) -> dict[str, str]:
+        return {'SORTME_API_URL': self.api_url, 'SORTME_WS_URL': self.ws_url}
+
+    def start(self):
+        self._threads = [
+            threading.Thread(target=self._http.serve_forever, daemon=True),
+            threading.Thread(target=self._ws.serve_forever, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._http.shutdown()
+        self._ws.shutdown()
+        self._http.server_close()
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *_):
+        self.stop()
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    defaults = ServerOptions()
+    parser.add_argument('--latency', type=float, default=defaults.latency * 1000, help='Milliseconds added to every response')
+    parser.add_argument('--rate-limit-every', type=int, default=defaults.rate_limit_every, help='Answer every Nth request with 429')
+    parser.add_argument('--tasks', type=int, default=defaults.tasks, help='Tasks per contest')
+    parser.add_argument('--history', type=int, default=defaults.history, help='Submissions per task')
+    parser.add_argument('--standings', type=int, default=defaults.standings, help='Rows in the contest table')
+    parser.add_argument('--tests', type=int, default=defaults.tests, help='Websocket progress messages per submission')
+    parser.add_argument('--ws-interval', type=float, default=defaults.ws_interval * 1000, help='Milliseconds between websocket messages')
+    parser.add_argument('--ws-drop-after', type=int, default=defaults.ws_drop_after, help='Cut the websocket after this many messages')
+    parser.add_argument('--starts-in', type=float, default=defaults.starts_in, help='Seconds until the contest starts, negative if it is running')
+    parser.add_argument('--ws-drops', type=int, default=defaults.ws_drops, help='How many websocket connections per submission get cut')
+
+
+def server_options(args: argparse.Namespace) -> ServerOptions:
+    return ServerOptions(
+        latency=args.latency / 1000,
+        rate_limit_every=args.rate_limit_every,
+        tasks=args.tasks,
+        history=args.history,
+        standings=args.standings,
+        tests=args.tests,
+        ws_interval=args.ws_interval / 1000,
+        ws_drop_after=args.ws_drop_after,
+        ws_drops=args.ws_drops,
+        starts_in=args.starts_in,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--ws-port', type=int, default=8081)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    with FakeServer(server_options(args), port=args.port, ws_port=args.ws_port) as server:
+        print(' '.join(f'{key}={value}' for key, value in server.env().items()))
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+# End-to-end timings of the CLI against benchmarks/fake_server.py.
+# Usage: python benchmarks/run.py [--repeat 5] [--latency 30] [--history 1000] [--standings 10000] ...
+# Every run is saved to benchmarks/results/<timestamp>.json and compared with the previous one.
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from datetime import datetime
+
+from tabulate import tabulate
+
+from fake_server import FakeServer, add_server_arguments, server_options
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_PATH = os.path.join(ROOT, 'benchmarks', 'results')
+
+CONTEST_ID = 301
+
+SOLUTION = '''#include <iostream>
+int main() {
+    long long a, b;
+    std::cin >> a >> b;
+    std::cout << a + b << std::endl;
+}
+'''
+
+COMMANDS = {
+    'init': ['init', str(CONTEST_ID)],
+    'push': ['push', 'a.cpp'],
+    'submissions': ['submissions', 'a'],
+    'contest': ['contest'],
+    'test': ['test', 'a.cpp'],
+}
+
+
+def make_home(path: str):
+    data_path = os.path.join(path, '.local', 'share')
+    os.makedirs(data_path)
+    with open(os.path.join(data_path, 'sortme_config.json'), 'w') as f:
+        json.dump({'api_key': 'benchmark', 'naming_convention': '(\\w).cpp', 'phone': '0'}, f)
+
+
+def run_command(argv: list[str], cwd: str, env: dict[str, str]) -> float:
+    start = time.perf_counter()
+    r = subprocess.run([sys.executable, os.path.join(ROOT, 'main.py'), *argv], cwd=cwd, env=env, stdin=subprocess.DEVNULL, capture_output=True)
+    elapsed = time.perf_counter() - start
+
+    if r.returncode:
+        raise RuntimeError(f"sm {' '.join(argv)} failed:\n{r.stderr.decode('utf-8', 'replace')}")
+    return elapsed
+
+
+def git_revision() -> str:
+    r = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True)
+    return r.stdout.strip() or 'unknown'
+
+
+def comparable(a: dict, b: dict) -> bool: # same server and CLI setup, the number of repeats doesn't matter
+    return {**a, 'repeat': None} == {**b, 'repeat': None}
+
+
+def previous_result(options: dict) -> dict | None: # the newest run with the same options
+    for path in sorted(glob.glob(os.path.join(RESULTS_PATH, '*.json')), reverse=True):
+        with open(path) as f:
+            result = json.load(f)
+        if comparable(result['options'], options):
+            return result
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--commands', nargs='+', choices=list(COMMANDS), default=list(COMMANDS))
+    parser.add_argument('--cache', action='store_true', help='Let the CLI use its response cache (off by default)')
+    parser.add_argument('--daemon', action='store_true', help='Serve commands through `sm daemon`')
+    parser.add_argument('--threshold', type=float, default=10, help='Percent slowdown reported as a regression')
+    parser.add_argument('--no-save', action='store_true')
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    options = server_options(args)
+    tmp = tempfile.mkdtemp(prefix='sortme-bench-')
+    home = os.path.join(tmp, 'home')
+    workspace = os.path.join(tmp, 'contest')
+    make_home(home)
+    os.makedirs(workspace)
+    with open(os.path.join(workspace, 'a.cpp'), 'w') as f:
+        f.write(SOLUTION)
+
+    results: dict[str, dict[str, float | list[float]]] = {}
+    try:
+        with FakeServer(options) as server:
+            env = {
+                **os.environ,
+                **server.env(),
+                'HOME': home,
+                'XDG_DATA_HOME': os.path.join(home, '.local', 'share'),
+                'XDG_CACHE_HOME': os.path.join(home, '.cache'),
+                'XDG_RUNTIME_DIR': tmp,
+                'SORTME_DAEMON': '1' if args.daemon else '0',
+            }
+            flags = [] if args.cache else ['--no-cache']
+
+            run_command(flags + COMMANDS['init'], workspace, env) # every other command needs .sortme.json
+
+            for name in args.commands:
+                timings = [run_command(flags + COMMANDS[name], workspace, env) for _ in range(args.repeat)]
+                results[name] = {
+                    'median': statistics.median(timings),
+                    'min': min(timings),
+                    'max': max(timings),
+                    'runs': timings,
+                }
+
+            if args.daemon:
+                subprocess.run([sys.executable, os.path.join(ROOT, 'main.py'), 'daemon', 'stop'], env=env, capture_output=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    run_options = {**vars(options), 'repeat': args.repeat, 'cache': args.cache, 'daemon': args.daemon}
+    previous = previous_result(run_options)
+    rows = []
+    regressions = []
+    for name, timing in results.items():
+        row = [name, f"{timing['median'] * 1000:.1f}", f"{timing['min'] * 1000:.1f}", f"{timing['max'] * 1000:.1f}"]
+        if previous and name in previous['results']:
+            delta = (timing['median'] / previous['results'][name]['median'] - 1) * 100
+            row.append(f'{delta:+.1f}%')
+            if delta > args.threshold:
+                regressions.append(name)
+        else:
+            row.append('')
+        rows.append(row)
+
+    print(tabulate(rows, headers=['Command', 'Median, ms', 'Min, ms', 'Max, ms', 'vs previous'], tablefmt='rounded_grid'))
+
+    if previous:
+        print(f"Previous run: {previous['revision']} at {previous['date']}")
+    else:
+        print("No comparable baseline: no earlier run with the same options")
+    if regressions:
+        print(f"Regressions over {args.threshold}%: {', '.join(regressions)}")
+
+    if not args.no_save:
+        os.makedirs(RESULTS_PATH, exist_ok=True)
+        date = datetime.now()
+        path = os.path.join(RESULTS_PATH, date.strftime('%Y%m%d-%H%M%S') + '.json')
+        with open(path, 'w') as f:
+            json.dump({
+                'date': date.isoformat(timespec='seconds'),
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'options': run_options,
+                'results': results,
+            }, f, indent=4)
+        print(f'Saved to {os.path.relpath(path, ROOT)}')
+
+    if regressions:
+        exit(1)
+
+
+if __name__ == '__main__':
+    main()
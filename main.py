@@ -1,25 +1,47 @@
+import sys
+
+from sort_me import daemon
+
+# hand the command over to a warm daemon before paying for the network stack imports
+if __name__ == "__main__" and daemon.enabled() and daemon.forwardable(sys.argv[1:]):
+    exit_code = daemon.forward(sys.argv[1:], __file__)
+    if exit_code is not None:
+        sys.exit(exit_code)
+
 import argparse # TODO: replace with https://github.com/swansonk14/typed-argument-parser
 import functools
+import glob
 import json
+import math
 import os
 from os.path import isfile
 import pathlib
+import re
+import statistics
 import subprocess
-import sys
+import tempfile
 import time
 
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
+from collections.abc import Iterable
 from typing import Union, cast
 
 import colorama
 from tabulate import tabulate
 
-from sort_me.types import BaseSubmission, FailedSubmission, ShortSubmission, ShortSubmissionBase, ContestTask, Config
+from sort_me.types import BaseSubmission, ShortSubmission, ContestTask, Config
 from sort_me.main import AuthProvider, SortMeAPI
+from sort_me.cache import ResponseCache
+from sort_me.archive import Archive
+from sort_me.search import SearchIndex, snippet
+from sort_me.trace import tracer
 from sort_me.exceptions import *
 
 SEPARATORS = [',', ' ']
 
+CLEAR_LINE = '\x1b[K'
+
 _superscript_map = {
     "0": "⁰", "1": "¹", "2": "²", "3": "³", "4": "⁴", "5": "⁵", "6": "⁶",
     "7": "⁷", "8": "⁸", "9": "⁹", "a": "ᵃ", "b": "ᵇ", "c": "ᶜ", "d": "ᵈ",
@@ -54,10 +76,10 @@ SUB_TRANS = str.maketrans(
 
 class PrettyPrinter:
     @classmethod
-    def _print_json(cls, obj: BaseSubmission | FailedSubmission | ShortSubmission | ShortSubmissionBase, end='\r', a_size=0, b_size=0):
-        if 'total_points' not in obj or obj['total_points'] == 0:
+    def _print_json(cls, obj: BaseSubmission | ShortSubmission, end='\r', a_size=0, b_size=0, final=True):
+        if not obj.total_points:
             color = colorama.Fore.RED
-        elif obj['total_points'] < 100:
+        elif obj.total_points < 100:
             color = colorama.Fore.RESET
         else:
             color = colorama.Fore.GREEN
@@ -66,40 +88,68 @@ class PrettyPrinter:
 
         sep = f'{colorama.Fore.RESET}{colorama.Fore.WHITE}{colorama.Style.DIM} | {colorama.Style.NORMAL}{color}'
 
-        pretty_str = f"{end}{color}"
-        if 'total_points' in obj:
-            pretty_str += f"{obj['total_points']}{' ' * (a_size - len(str(obj['total_points'])))}" + sep
+        clear = CLEAR_LINE if end == '\r' else '' # redrawing the status line
+        pretty_str = f"{end}{clear}{color}"
+        if obj.total_points is not None:
+            pretty_str += f"{obj.total_points}{' ' * (a_size - len(str(obj.total_points)))}" + sep
         else:
             pretty_str += ' ' * a_size + '   '
 
-        pretty_str += obj['shown_verdict_text'] + (' ' * (b_size - len(obj["shown_verdict_text"])))
+        pretty_str += obj.shown_verdict_text + (' ' * (b_size - len(obj.shown_verdict_text)))
 
-        if 'shown_test' in obj:
-            pretty_str += sep + str(obj['shown_test'])
+        if obj.shown_test is not None:
+            pretty_str += sep + str(obj.shown_test)
 
-        print(pretty_str, colorama.Style.RESET_ALL)
+        print(pretty_str, colorama.Style.RESET_ALL, end='\n' if final else '', flush=True)
 
         # print(f"{end}{color}{str(obj['total_points']) + ('  ' if obj['total_points'] == 0 else '') + sep if 'total_points' in obj else ' '}{obj['shown_verdict_text']}{(sep + str(obj['shown_test'])) if 'shown_test' in obj else ''}{colorama.Style.RESET_ALL}")
 
     @classmethod
     def _print_int(cls, num: int):
-        print(f"\r{colorama.Style.DIM}Проверяется... {num}", end='')
+        print(f"\r{CLEAR_LINE}{colorama.Style.DIM}Проверяется... {num}", end='', flush=True)
 
     @classmethod
-    def print(cls, obj: int | Union[BaseSubmission, FailedSubmission, ShortSubmission]):
+    def print(cls, obj: int | Union[BaseSubmission, ShortSubmission], final=True):
         if isinstance(obj, int):
             cls._print_int(obj)
         else:
-            cls._print_json(obj)
+            cls._print_json(obj, final=final)
 
     @classmethod
-    def print_list(cls, obj: list[ShortSubmission | ShortSubmissionBase]):
+    def print_stream(cls, messages: Iterable[int | BaseSubmission], interval=0.1):
+        # a single status line, redrawn at most every `interval` seconds; the verdict is always printed
+        last = None
+        last_time = 0.0
+        pending = None
+
+        for message in messages:
+            final = isinstance(message, BaseSubmission) and message.completed
+            if final:
+                cls.print(message)
+                return
+
+            if message == last:
+                continue
+            if time.monotonic() - last_time < interval:
+                pending = message
+                continue
+
+            cls.print(message, final=False)
+            last, last_time, pending = message, time.monotonic(), None
+
+        if pending is not None:
+            cls.print(pending, final=False)
+        if last is not None or pending is not None:
+            print(colorama.Style.RESET_ALL)
+
+    @classmethod
+    def print_list(cls, obj: list[ShortSubmission]):
         max_a = 0
         max_b = 0
         for submission in obj:
-            if 'total_points' in submission:
-                max_a = max(max_a, len(str(submission['total_points'])))
-            max_b = max(max_b, len(submission['shown_verdict_text']))
+            if submission.total_points is not None:
+                max_a = max(max_a, len(str(submission.total_points)))
+            max_b = max(max_b, len(submission.shown_verdict_text))
 
         max_spaces = len(str(len(obj)))
 
@@ -194,6 +244,86 @@ def print_task(task: ContestTask):
     print(f'Лимит по памяти: ', bright(str(task.memory_limit_megabytes) + "МБ"))
 
 
+_GPROF_FLAT_LINE = re.compile(r'^\s*([\d.]+)\s+[\d.]+\s+([\d.]+)\s+(?:(\d+)\s+[\d.]+\s+[\d.]+\s+)?(.+)$')
+_GPROF_GRAPH_LINE = re.compile(r'^\[\d+\]\s+[\d.]+\s+([\d.]+)\s+([\d.]+)\s+(?:[\d+]+\s+)?(.+?) \[\d+\]$')
+
+def gprof_flat(text: str) -> list[tuple[str, float, float, int | None]]:
+    # name, % of the time, self seconds, calls
+    out = []
+    for line in text.splitlines():
+        match = _GPROF_FLAT_LINE.match(line)
+        if match:
+            out.append((match.group(4).strip(), float(match.group(1)), float(match.group(2)), int(match.group(3)) if match.group(3) else None))
+    return out
+
+def gprof_totals(text: str) -> dict[str, float]:
+    # self + children seconds from the call graph
+    out = {}
+    for line in text.splitlines():
+        match = _GPROF_GRAPH_LINE.match(line)
+        if match:
+            out[match.group(3).strip()] = float(match.group(1)) + float(match.group(2))
+    return out
+
+
+def _ranks(values: list[float]) -> tuple[list[float], float]:
+    # average ranks (1-based) and the tie correction sum(t^3 - t)
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0.0] * len(values)
+    ties = 0.0
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        t = j - i + 1
+        ties += t ** 3 - t
+        i = j + 1
+    return ranks, ties
+
+def mann_whitney_p(a: list[float], b: list[float]) -> float:
+    # two-sided, normal approximation with tie and continuity correction
+    n1, n2 = len(a), len(b)
+    n = n1 + n2
+    ranks, ties = _ranks(a + b)
+    u = sum(ranks[:n1]) - n1 * (n1 + 1) / 2
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))))
+    if sigma == 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / sigma
+    return min(1.0, math.erfc(max(z, 0) / math.sqrt(2)))
+
+def wilcoxon_p(differences: list[float]) -> float:
+    # two-sided signed-rank test, normal approximation, zero differences dropped
+    d = [x for x in differences if x != 0]
+    n = len(d)
+    if n == 0:
+        return 1.0
+    ranks, ties = _ranks([abs(x) for x in d])
+    w = sum(rank for rank, x in zip(ranks, d) if x > 0)
+    sigma = math.sqrt(n * (n + 1) * (2 * n + 1) / 24 - ties / 48)
+    if sigma == 0:
+        return 1.0
+    z = (abs(w - n * (n + 1) / 4) - 0.5) / sigma
+    return min(1.0, math.erfc(max(z, 0) / math.sqrt(2)))
+
+
+def positive_int(value: str) -> int:
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f'expected a positive number, got {value}')
+    return n
+
+
+def non_negative_int(value: str) -> int:
+    n = int(value)
+    if n < 0:
+        raise argparse.ArgumentTypeError(f'expected a non-negative number, got {value}')
+    return n
+
+
 def printn(x):
     if '\n' in x:
         print(f'\n{x}\n')
@@ -238,8 +368,36 @@ class ApiWorker():
 
         with open(filepath) as config_file:
             self._config = Config(**json.load(config_file))
+        self._config_path = filepath
+        self._config_mtime = os.stat(filepath).st_mtime
+
+        cache_path = (os.environ.get('XDG_CACHE_HOME') or os.environ['HOME'] + "/.cache") + "/sortme/http"
+        self._cache = ResponseCache(cache_path)
+        self._archive_path = data_path + "/sortme_archive.sqlite3"
+        self._index = SearchIndex(data_path + "/sortme_search.sqlite3")
+        self._api = SortMeAPI(self._config.api_key, self._cache, self._index)
+
+    def reload_config(self):
+        # the daemon outlives `sm` calls, pick up a re-login or a new template path without a restart
+        mtime = os.stat(self._config_path).st_mtime
+        if mtime == self._config_mtime:
+            return
+
+        with open(self._config_path) as config_file:
+            self._config = Config(**json.load(config_file))
+        self._config_mtime = mtime
+        self._api = SortMeAPI(self._config.api_key, self._cache, self._index)
+
+    def configure(self, args: argparse.Namespace):
+        self._cache.enabled = not args.no_cache
+        self._api.offline = args.offline
+        tracer.reset(args.trace or bool(args.trace_file))
 
-        self._api = SortMeAPI(self._config.api_key)
+    def report(self, args: argparse.Namespace):
+        if args.trace and tracer.spans:
+            print(tabulate(tracer.summary(), headers=['', 'Span', 'Calls', 'Total, ms', 'Max, ms', 'Bytes', 'Retries', 'Connects'], tablefmt='rounded_grid'), file=sys.stderr)
+        if args.trace_file:
+            tracer.write_chrome_trace(args.trace_file)
 
     def reauth(self):
         filepath = os.environ['HOME'] + "/sortme_config.json"
@@ -250,7 +408,7 @@ class ApiWorker():
 
         with open(filepath, 'w') as config_file:
             json.dump(cfg, config_file)
-            self._api = SortMeAPI(cfg['api_key'])
+            self._api = SortMeAPI(cfg['api_key'], self._cache, self._index)
 
     def push(self, args: argparse.Namespace):
         while True:
@@ -285,12 +443,12 @@ class ApiWorker():
 
             try:
                 id = self._api.upload_code(code, data['contest_id'], task_id)
-                for message in self._api.get_task_stats(id):
-                    PrettyPrinter.print(message)
+                PrettyPrinter.print_stream(self._api.get_task_stats(id))
                 break
             except SortMeAPIException as exc:
                 if exc.status_code == 429:
-                    time.sleep(3)
+                    with tracer.span('429 backoff', 'http', retries=1):
+                        time.sleep(3)
                     continue
 
                 print(exc, exc.status_code)
@@ -300,19 +458,140 @@ class ApiWorker():
     #     print_task(self._api.get_contest_task(172, ord(args.task_number) - ord('A')))
     #     __import__('pprint').pprint(self._api.get_contest_tasks(172)[0])
 
+    TIME_LIMIT_FACTOR = 3 # `test --all` kills a run after this many time limits
+    FALLBACK_TIME_LIMIT = 5000 # ms, when the task's limit is unknown
+    KEEPALIVE_INTERVAL = 20
+    START_RETRY_INTERVAL = 0.2
+    START_TIMEOUT = 120
+    START_REQUEST_TIMEOUT = 3 # one hung request must not eat the START_TIMEOUT window
+
+    def _wait_for_tasks(self, contest_id: int) -> list[ContestTask]:
+        dim = lambda x: f'{colorama.Style.DIM}{x}{colorama.Style.NORMAL}'
+
+        # the server clock is the one that matters, `now` is taken somewhere between sending and receiving.
+        # A cached answer would carry an old `now`, so this and the requests below never touch the cache
+        sent = time.time()
+        try:
+            info = self._api.get_contest_info(contest_id, fresh=True)
+        except (SortMeAPIException, OSError) as exc:
+            print(f"Error! Unable to get contest {contest_id}: {exc}", file=sys.stderr)
+            exit(1)
+        offset = info.now - (sent + time.time()) / 2 if info.now else 0 # no server clock, trust ours
+        starts = info.starts - offset
+
+        last_keepalive = time.monotonic()
+        while (remaining := starts - time.time()) > 0:
+            print(f"\r{CLEAR_LINE}{info.name}: {dim('до начала')} {int(remaining) // 3600}:{int(remaining) % 3600 // 60:02d}:{int(remaining) % 60:02d}", end='', flush=True)
+            time.sleep(min(remaining, 1))
+
+            if time.monotonic() - last_keepalive > self.KEEPALIVE_INTERVAL and remaining > 2: # keep the TLS connection warm
+                try:
+                    self._api.get_contest_info(contest_id, fresh=True, timeout=self.START_REQUEST_TIMEOUT)
+                except (SortMeAPIException, OSError):
+                    pass
+                last_keepalive = time.monotonic()
+        print(f"\r{CLEAR_LINE}", end='', flush=True)
+
+        deadline = time.monotonic() + self.START_TIMEOUT
+        while time.monotonic() < deadline: # "not started" until our clocks agree, don't back off, just keep asking
+            try:
+                tasks = self._api.get_contest_tasks(contest_id, fresh=True, timeout=self.START_REQUEST_TIMEOUT)
+                if tasks:
+                    return tasks
+            except OSError: # everyone hits the server in the same second, timeouts included
+                pass
+            except SortMeAPIException as exc:
+                # 403 is "not started yet", 429 and 5xx are the rush; anything else (wrong id, expired token) won't go away
+                if exc.status_code not in (403, 429) and (exc.status_code or 0) < 500:
+                    print(f"Error! {exc}!", file=sys.stderr)
+                    exit(1)
+            time.sleep(self.START_RETRY_INTERVAL)
+
+        print("Error! Tasks didn't show up!", file=sys.stderr)
+        exit(1)
+
     def init(self, args):
-        tasks = [task.id for task in self._api.get_contest_tasks(args.contest_id)]
-        tests = [[{'stdin': y.input, 'stdout': y.output} for y in self._api.get_contest_task(args.contest_id, task).samples] for task in range(len(tasks))]
+        if args.wait:
+            tasks = self._wait_for_tasks(args.contest_id)
+        else:
+            tasks = self._api.get_contest_tasks(args.contest_id)
 
         data = {
             'contest_id': args.contest_id,
-            'tasks': tasks,
-            'tests': tests
+            'tasks': [task.id for task in tasks],
+            'tests': [[{'stdin': y.input, 'stdout': y.output} for y in task.samples] for task in tasks]
         }
 
         with open('.sortme.json', 'w') as file:
             json.dump(data, file, indent=4)
 
+        if args.wait or args.create:
+            template_path = args.template_path or self._config.template_path
+            if not template_path or not os.path.isfile(template_path):
+                print("Error! Template path missing!", file=sys.stderr)
+                return
+
+            with open(template_path) as f:
+                template = f.read()
+
+            for idx in range(len(tasks)):
+                filename = chr(ord('a') + idx) + '.cpp'
+                if not os.path.isfile(filename) and not os.path.isfile(chr(ord('A') + idx) + '.cpp'):
+                    with open(filename, 'w') as f:
+                        f.write(template)
+
+            print(f"{len(tasks)} задач: {', '.join(chr(ord('a') + idx) + '.cpp' for idx in range(len(tasks)))}")
+
+    @staticmethod
+    def _load_tests(data: dict, task_id: int) -> list[dict[str, str]]:
+        tests = data['tests'][task_id]
+
+        test_filename = chr(task_id + ord('A')) + '.t'
+        if not os.path.isfile(test_filename):
+            test_filename = chr(task_id + ord('a')) + '.t'
+        if not os.path.isfile(test_filename):
+            test_filename = chr(task_id + ord('A')) + '.test'
+        if not os.path.isfile(test_filename):
+            test_filename = chr(task_id + ord('a')) + '.test'
+        if not os.path.isfile(test_filename):
+            test_filename = None
+
+        if test_filename:
+            with open(test_filename) as f:
+                test_data = f.read().strip().split('\n\n\n')
+            for test in test_data:
+                t = test.split("\n\n")
+                tests.append({'stdin': t[0].strip(), 'stdout': t[1].strip()})
+
+        return tests
+
+    @staticmethod
+    def _compile(filename: str, output: str, capture_output = False, flags: str = '') -> subprocess.CompletedProcess:
+        with tracer.span('g++', 'compile', filename=filename, flags=flags) as span:
+            comp = subprocess.run(f'g++ -std=c++20 {flags} {filename} -o {output}'.split(), capture_output=capture_output, text=True)
+            span.set(returncode=comp.returncode)
+        return comp
+
+    @staticmethod
+    def _run_test(binary: str, test: dict[str, str], name: str, cpu: int | None = None, timeout: float | None = None) -> tuple[int | None, str, float]:
+        # the return code is None if the run was killed after `timeout` seconds
+        pin = (lambda: os.sched_setaffinity(0, {cpu})) if cpu is not None else None
+
+        with tracer.span(name, 'run', bytes=len(test['stdin'])) as span:
+            start = time.perf_counter()
+            pr = subprocess.Popen([binary], stdin=subprocess.PIPE, stdout=subprocess.PIPE, preexec_fn=pin)
+            try:
+                stdout = pr.communicate(test['stdin'].encode('utf-8'), timeout=timeout)[0]
+                returncode = pr.returncode
+            except subprocess.TimeoutExpired:
+                pr.kill()
+                stdout = pr.communicate()[0]
+                returncode = None
+            output = stdout.decode('utf-8', 'replace').strip()
+            elapsed = time.perf_counter() - start
+            span.set(returncode=returncode)
+        return returncode, output, elapsed
+
     def test(self, args):
         dim = lambda x: f'{colorama.Style.DIM}{x}{colorama.Style.NORMAL}'
         bright = lambda x: f'{colorama.Style.BRIGHT}{x}{colorama.Style.NORMAL}'
@@ -324,6 +603,14 @@ class ApiWorker():
         with open(".sortme.json") as datafile:
             data = json.load(datafile)
 
+        if args.all:
+            self._test_all(data, args.jobs or os.cpu_count() or 1)
+            return
+
+        if not args.filename:
+            print("Error! Specify a file to test or use --all!", file=sys.stderr)
+            exit(1)
+
         if '.cpp' in args.filename:
             filename = args.filename
         else:
@@ -343,34 +630,16 @@ class ApiWorker():
         else:
             task_id = ord(pathlib.Path(filename).stem.upper()) - ord('A')
 
-        tests = data['tests'][task_id]
+        tests = self._load_tests(data, task_id)
 
-        test_filename = chr(task_id + ord('A')) + '.t'
-        if not os.path.isfile(test_filename):
-            test_filename = chr(task_id + ord('a')) + '.t'
-        if not os.path.isfile(test_filename):
-            test_filename = chr(task_id + ord('A')) + '.test'
-        if not os.path.isfile(test_filename):
-            test_filename = chr(task_id + ord('a')) + '.test'
-        if not os.path.isfile(test_filename):
-            test_filename = None
-
-        if test_filename:
-            with open(test_filename) as f:
-                test_data = f.read().strip().split('\n\n\n')
-            for test in test_data:
-                t = test.split("\n\n")
-                tests.append({'stdin': t[0].strip(), 'stdout': t[1].strip()})
-
-        comp = subprocess.run(f'g++ -std=c++20 {filename} -o .a.out'.split())
+        comp = self._compile(filename, '.a.out')
 
         if comp.returncode:
             return
 
-        for idx, test in enumerate(data['tests'][task_id]):
-            pr = subprocess.Popen(['./.a.out'], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        for idx, test in enumerate(tests):
             print(f'Тест {idx+1}: ', end='')
-            output = pr.communicate(test['stdin'].encode('utf-8'))[0].decode('utf-8').strip()
+            _, output, _ = self._run_test('./.a.out', test, f'test {idx+1}')
             fail = True
             if test['stdout'].strip() == output:
                 print(f'{colorama.Fore.GREEN}PASS{colorama.Style.RESET_ALL}')
@@ -383,11 +652,287 @@ class ApiWorker():
                 printn(output)
                 print(bright( 'Ожидаемый вывод:' ), end='')
                 printn(test['stdout'].strip())
-            if idx+1 != len(data['tests'][task_id]) and fail:
+            if idx+1 != len(tests) and fail:
                 print()
 
         os.remove('.a.out')
 
+    def _test_all(self, data: dict, jobs: int):
+        dim = lambda x: f'{colorama.Style.DIM}{x}{colorama.Style.NORMAL}'
+
+        sources: dict[int, str] = {}
+        for task_id in range(len(data['tasks'])):
+            for filename in (chr(task_id + ord('A')) + '.cpp', chr(task_id + ord('a')) + '.cpp'):
+                if os.path.isfile(filename):
+                    sources[task_id] = filename
+                    break
+
+        if not sources:
+            print("Error! No task sources found!", file=sys.stderr)
+            exit(1)
+
+        tests = {task_id: self._load_tests(data, task_id) for task_id in sources}
+
+        try: # a looping solution is killed after a few time limits instead of holding up the whole table
+            limits = {task_id: task.time_limit_milliseconds for task_id, task in enumerate(self._api.get_contest_tasks(data['contest_id']))}
+        except (SortMeAPIException, OSError): # offline and not cached
+            limits = {}
+        timeouts = {task_id: limits.get(task_id, self.FALLBACK_TIME_LIMIT) * self.TIME_LIMIT_FACTOR / 1000 for task_id in sources}
+
+        # not ./.a.out: a plain `sm test` in the same directory would overwrite and delete it mid-run
+        with tempfile.TemporaryDirectory(prefix='sortme-test-') as tmp:
+            binaries = {task_id: os.path.join(tmp, f'{chr(task_id + ord("a"))}.out') for task_id in sources}
+
+            # one pool for everything: compilations first, then every test of every task as soon as its binary is ready
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                compilations = {pool.submit(self._compile, sources[task_id], binaries[task_id], True): task_id for task_id in sources}
+                runs: dict[tuple[int, int], Future] = {}
+                failed_builds: dict[int, str] = {}
+
+                for future in as_completed(compilations):
+                    task_id = compilations[future]
+                    comp = future.result()
+                    if comp.returncode:
+                        failed_builds[task_id] = comp.stderr
+                        continue
+                    for idx, test in enumerate(tests[task_id]):
+                        runs[task_id, idx] = pool.submit(self._run_test, binaries[task_id], test, f'{chr(task_id + ord("A"))} test {idx+1}', timeout=timeouts[task_id])
+
+                results = {key: future.result() for key, future in runs.items()}
+
+        width = max(len(x) for x in tests.values())
+        rows = []
+        failed = bool(failed_builds)
+        for task_id in sorted(sources):
+            row = [dim(chr(task_id + ord('A')))]
+            if task_id in failed_builds:
+                row.append(f'{colorama.Fore.RED}CE{colorama.Style.RESET_ALL}')
+                rows.append(row)
+                continue
+
+            for idx, test in enumerate(tests[task_id]):
+                returncode, output, elapsed = results[task_id, idx]
+                if returncode is None:
+                    verdict = f'{colorama.Fore.RED}TL{colorama.Style.RESET_ALL}'
+                elif returncode:
+                    verdict = f'{colorama.Fore.RED}RE{colorama.Style.RESET_ALL}'
+                elif test['stdout'].strip() != output:
+                    verdict = f'{colorama.Fore.RED}WA{colorama.Style.RESET_ALL}'
+                else:
+                    verdict = f'{colorama.Fore.GREEN}OK{colorama.Style.RESET_ALL}'
+                failed = failed or returncode != 0 or test['stdout'].strip() != output
+                row.append(f'{verdict} {dim(f"{elapsed * 1000:.0f}мс")}')
+            rows.append(row)
+
+        print(tabulate(rows, headers=[''] + [dim(str(x + 1)) for x in range(width)], tablefmt='rounded_grid'))
+
+        for task_id, log in sorted(failed_builds.items()):
+            print(f"\n{dim(sources[task_id] + ':')}\n{log.strip()}", file=sys.stderr)
+
+        if failed:
+            exit(1)
+
+    def profile(self, args):
+        dim = lambda x: f'{colorama.Style.DIM}{x}{colorama.Style.NORMAL}'
+        bright = lambda x: f'{colorama.Style.BRIGHT}{x}{colorama.Style.NORMAL}'
+
+        if not os.path.isfile('./.sortme.json'):
+            print('Error! ".sortme.json" is missing! Run "sm init" to create it!', file=sys.stderr)
+            exit(1)
+
+        with open(".sortme.json") as datafile:
+            data = json.load(datafile)
+
+        if '.cpp' in args.filename:
+            filename = args.filename
+        else:
+            filename = args.filename.upper() + '.cpp'
+            if not os.path.isfile(filename):
+                filename = filename.lower()
+
+        if not os.path.isfile(filename):
+            print(f"Error! {filename} doesn't exist!", file=sys.stderr)
+            exit(1)
+
+        if args.task_id:
+            if args.task_id.isnumeric():
+                task_id = int(args.task_id)
+            else:
+                task_id = ord(args.task_id.upper()) - ord('A')
+        else:
+            task_id = ord(pathlib.Path(filename).stem.upper()) - ord('A')
+
+        tests = self._load_tests(data, task_id)
+        if not tests:
+            print("Error! No tests for this task!", file=sys.stderr)
+            exit(1)
+
+        if args.test:
+            if not 0 < args.test <= len(tests):
+                print(f"Error! There are only {len(tests)} tests!", file=sys.stderr)
+                exit(1)
+            test_idx = args.test - 1
+        else: # the heaviest one, as far as we can tell without running all of them
+            test_idx = max(range(len(tests)), key=lambda idx: len(tests[idx]['stdin']))
+        test = tests[test_idx]
+
+        with tempfile.TemporaryDirectory(prefix='sortme-profile-') as tmp:
+            binary = os.path.join(tmp, 'a.out')
+            flags = '-O2 -g -pg -fno-omit-frame-pointer' + ('' if args.inline else ' -fno-inline') # inlined code is all blamed on the caller
+            comp = self._compile(filename, binary, flags=flags)
+            if comp.returncode:
+                return
+
+            elapsed = []
+            for _ in range(args.repeat): # samples are 10ms apart, short runs need a few rounds to show anything
+                with tracer.span(f'test {test_idx+1}', 'profile'):
+                    start = time.perf_counter()
+                    pr = subprocess.run([binary], input=test['stdin'].encode('utf-8'), capture_output=True, cwd=tmp, env={**os.environ, 'GMON_OUT_PREFIX': 'gmon.out'})
+                    elapsed.append(time.perf_counter() - start)
+                if pr.returncode:
+                    print(f"{colorama.Fore.RED}Runtime error ({pr.returncode}){colorama.Style.RESET_ALL}", file=sys.stderr)
+                    return
+
+            output = pr.stdout.decode('utf-8', 'replace').strip()
+            gmon_files = glob.glob(os.path.join(tmp, 'gmon.out.*'))
+            functions = subprocess.run(['gprof', '-b', '-p', binary, *gmon_files], capture_output=True, text=True).stdout
+            graph = subprocess.run(['gprof', '-b', '-q', binary, *gmon_files], capture_output=True, text=True).stdout # empty without any calls
+            lines = subprocess.run(['gprof', '-b', '-l', '-p', binary, *gmon_files], capture_output=True, text=True).stdout
+
+        verdict = f'{colorama.Fore.GREEN}PASS{colorama.Style.RESET_ALL}' if output == test['stdout'].strip() else f'{colorama.Fore.RED}FAIL{colorama.Style.RESET_ALL}'
+        print(f"{bright(filename)}, тест {test_idx+1}: {verdict}, {bright(f'{min(elapsed) * 1000:.0f}мс')}", end='')
+        try:
+            limit = self._api.get_contest_task(data['contest_id'], task_id).time_limit_milliseconds
+            print(f" {dim(f'из {limit}мс')}")
+        except (SortMeAPIException, OSError): # offline and not cached, not important enough to fail
+            print()
+
+        flat = gprof_flat(functions)
+        if not flat:
+            print(dim("\nНет данных профилировщика: программа работает слишком быстро, попробуйте --repeat"))
+            return
+
+        totals = gprof_totals(graph)
+        print()
+        print(dim('Функции:'))
+        print(tabulate(
+            [[name, f'{percent:.1f}', f'{self_seconds:.2f}', f'{totals.get(name, self_seconds):.2f}', '' if calls is None else calls] for name, percent, self_seconds, calls in flat[:args.top]],
+            headers=[dim(x) for x in ['Функция', 'Self, %', 'Self, с', 'Всего, с', 'Вызовов']],
+            tablefmt='rounded_grid',
+        ))
+
+        by_line: dict[str, list[float]] = {}
+        for name, percent, self_seconds, _ in gprof_flat(lines):
+            key = re.sub(r' @ [0-9a-f]+\)$', ')', name) # several address ranges map to the same line
+            by_line.setdefault(key, [0.0, 0.0])
+            by_line[key][0] += percent
+            by_line[key][1] += self_seconds
+
+        if by_line:
+            print()
+            print(dim('Строки:'))
+            print(tabulate(
+                [[name, f'{percent:.1f}', f'{self_seconds:.2f}'] for name, (percent, self_seconds) in sorted(by_line.items(), key=lambda x: -x[1][1])[:args.top]],
+                headers=[dim(x) for x in ['Строка', 'Self, %', 'Self, с']],
+                tablefmt='rounded_grid',
+            ))
+
+    def compare(self, args):
+        dim = lambda x: f'{colorama.Style.DIM}{x}{colorama.Style.NORMAL}'
+        bright = lambda x: f'{colorama.Style.BRIGHT}{x}{colorama.Style.NORMAL}'
+        red = lambda x: f'{colorama.Fore.RED}{x}{colorama.Style.RESET_ALL}'
+        green = lambda x: f'{colorama.Fore.GREEN}{x}{colorama.Style.RESET_ALL}'
+
+        if not os.path.isfile('./.sortme.json'):
+            print('Error! ".sortme.json" is missing! Run "sm init" to create it!', file=sys.stderr)
+            exit(1)
+
+        with open(".sortme.json") as datafile:
+            data = json.load(datafile)
+
+        for filename in (args.first, args.second):
+            if not os.path.isfile(filename):
+                print(f"Error! {filename} doesn't exist!", file=sys.stderr)
+                exit(1)
+
+        if args.task_id:
+            if args.task_id.isnumeric():
+                task_id = int(args.task_id)
+            else:
+                task_id = ord(args.task_id.upper()) - ord('A')
+        else:
+            task_id = ord(pathlib.Path(args.first).stem[0].upper()) - ord('A') # a.cpp vs a_fast.cpp
+
+        tests = self._load_tests(data, task_id)
+        if not tests:
+            print("Error! No tests for this task!", file=sys.stderr)
+            exit(1)
+
+        with tempfile.TemporaryDirectory(prefix='sortme-compare-') as tmp:
+            binaries = [os.path.join(tmp, 'a.out'), os.path.join(tmp, 'b.out')]
+            for filename, binary in zip((args.first, args.second), binaries):
+                if self._compile(filename, binary).returncode:
+                    return
+
+            times: list[list[list[float]]] = [[[] for _ in tests] for _ in binaries]
+            mismatches: set[int] = set()
+            for repeat in range(args.warmup + args.repeat):
+                for idx, test in enumerate(tests):
+                    order = [0, 1] if (repeat + idx) % 2 == 0 else [1, 0] # alternate who goes first, so drift hits both
+                    outputs = [None, None]
+                    for side in order:
+                        returncode, output, elapsed = self._run_test(binaries[side], test, f'{"AB"[side]} test {idx+1}', args.cpu)
+                        if returncode:
+                            print(red(f"{(args.first, args.second)[side]}: runtime error ({returncode}) on test {idx+1}"), file=sys.stderr)
+                            exit(1)
+                        outputs[side] = output
+                        if repeat >= args.warmup:
+                            times[side][idx].append(elapsed)
+                    if outputs[0] != outputs[1]:
+                        mismatches.add(idx)
+
+        try:
+            limit: int | None = self._api.get_contest_task(data['contest_id'], task_id).time_limit_milliseconds
+        except (SortMeAPIException, OSError): # offline and not cached, it is only for context
+            limit = None
+
+        def verdict(p: float, ratio: float) -> str:
+            if p >= args.alpha:
+                return dim('≈')
+            return green('B быстрее') if ratio < 1 else red('B медленнее')
+
+        def ms(x: float) -> str:
+            return f'{x * 1000:.1f}'
+
+        rows = []
+        pairs = []
+        for idx in range(len(tests)):
+            a, b = times[0][idx], times[1][idx]
+            median_a, median_b = statistics.median(a), statistics.median(b)
+            ratio = median_b / median_a
+            p = mann_whitney_p(a, b)
+            pairs.extend(math.log(y / x) for x, y in zip(a, b))
+
+            over = lambda x: red(ms(x)) if limit and x * 1000 > limit else ms(x)
+            iqr = lambda x: ms(statistics.quantiles(x, n=4)[2] - statistics.quantiles(x, n=4)[0]) if len(x) > 1 else '0'
+            rows.append([
+                dim(idx + 1) + (red(' ≠') if idx in mismatches else ''),
+                over(median_a), iqr(a),
+                over(median_b), iqr(b),
+                f'{ratio:.3f}', f'{p:.3f}', verdict(p, ratio),
+            ])
+
+        print(f"{bright('A')} = {args.first}, {bright('B')} = {args.second}, {args.repeat} повторов" + (f", лимит {limit}мс" if limit else ''))
+        print(tabulate(rows, headers=[dim(x) for x in ['Тест', 'A, мс', 'A IQR', 'B, мс', 'B IQR', 'B/A', 'p', '']], tablefmt='rounded_grid'))
+
+        overall = math.exp(statistics.fmean(pairs))
+        p = wilcoxon_p(pairs)
+        print(f"Итого: B/A = {bright(f'{overall:.3f}')}, p = {p:.3f}, {verdict(p, overall)}")
+
+        if mismatches:
+            print(red(f"Выводы различаются на тестах: {', '.join(str(idx + 1) for idx in sorted(mismatches))}"))
+            exit(1)
+
     def submissions(self, args):
         if not os.path.isfile('./.sortme.json'):
             print('Error! ".sortme.json" is missing! Run "sm init" to create it!', file=sys.stderr)
@@ -419,8 +964,8 @@ class ApiWorker():
             data = json.load(datafile)
 
         contest_info = self._api.get_contest(data['contest_id'])
-        if contest_info["ends"] != -1:
-            a = datetime.fromtimestamp(contest_info['ends']) - datetime.now()
+        if contest_info.ends != -1:
+            a = datetime.fromtimestamp(contest_info.ends) - datetime.now()
 
             days, seconds = a.days, a.seconds
             hours = (seconds % 2160000) // 3600
@@ -434,11 +979,11 @@ class ApiWorker():
         else:
             end_time = f'{colorama.Fore.RED}Закончен{colorama.Style.RESET_ALL}'
 
-        print(f"{contest_info['name'].replace('№', '№ ')}: {end_time}\n\nЗадачи:")
-        for idx, task in enumerate(contest_info['tasks']):
+        print(f"{contest_info.name.replace('№', '№ ')}: {end_time}\n\nЗадачи:")
+        for idx, task in enumerate(contest_info.tasks):
             print(f"{colorama.Style.DIM}{chr(ord('A')+idx)}.{colorama.Style.RESET_ALL} {colorama.Style.BRIGHT}{task}{colorama.Style.RESET_ALL}")
 
-        place = contest_info['place']
+        place = contest_info.you.place
         place_color = colorama.Fore.BLACK + colorama.Back.YELLOW if place < 3 else colorama.Fore.YELLOW if place < 10 else colorama.Fore.GREEN if place < 50 else ''
 
         print(f"\nМесто в рейтинге: {place_color}{place}{colorama.Style.RESET_ALL}")
@@ -446,7 +991,7 @@ class ApiWorker():
         print("Баллы: ",end='')
         result_string = ''
         solved_count = 0
-        for result_with_time in contest_info['results']:
+        for result_with_time in contest_info.you.results:
             result = result_with_time[0]
             if result == -1:
                 result_string += f'{colorama.Style.DIM}-{colorama.Style.RESET_ALL}'
@@ -481,7 +1026,7 @@ class ApiWorker():
         subm = self._api.get_submission_info(data['contest_id'], task_id, args.submission_id)
 
         with open(".code_tmp.cpp", 'w') as code_file:
-            code_file.write(subm['code'])
+            code_file.write(subm.code)
 
         subprocess.run('vim .code_tmp.cpp'.split())
 
@@ -526,7 +1071,7 @@ class ApiWorker():
         dim = lambda x: f'{colorama.Style.DIM}{x}{colorama.Style.NORMAL}'
         bright = lambda x: f'{colorama.Style.BRIGHT}{x}{colorama.Style.NORMAL}'
 
-        raw_tasks = self._api.get_contest_tasks(data['contest_id'])[:]
+        raw_tasks = self._api.get_contest_tasks(data['contest_id'], max_age=60)[:] # solved_by goes stale fast
         tasks = list(zip(range(len(raw_tasks)), raw_tasks))
         bubble_sort(tasks)
 
@@ -556,10 +1101,146 @@ class ApiWorker():
             f.write(template)
 
 
+    def sync(self, args):
+        dim = lambda x: f'{colorama.Style.DIM}{x}{colorama.Style.NORMAL}'
+
+        try:
+            if args.contest_id:
+                info = self._api.get_contest_info(args.contest_id)
+                contests = [(info.id, info.name, info.starts, info.ends)]
+            else:
+                contests = [(c.id, c.name, c.starts, c.ends) for c in self._api.get_contest_history()]
+        except (SortMeAPIException, OSError) as exc:
+            print(f"Error! Unable to get the list of contests: {exc}", file=sys.stderr)
+            exit(1)
+
+        with Archive(self._archive_path) as archive:
+            total = 0
+            for contest_id, name, starts, ends in contests:
+                try:
+                    archive.save_contest(contest_id, name, starts, ends)
+                    if args.full or not archive.has_tasks(contest_id):
+                        archive.save_tasks(contest_id, self._api.get_contest_tasks(contest_id))
+
+                    new = 0
+                    for task_id in archive.task_ids(contest_id):
+                        newest = 0 if args.full else archive.newest_submission(contest_id, task_id)
+                        _, submissions = self._api.get_submission_history(contest_id, task_id, stop_at=newest)
+                        archive.save_submissions(contest_id, task_id, submissions)
+                        new += len(submissions)
+
+                        # time to AC needs the submission time, which only the verbose endpoint has, so it is fetched
+                        # once per task: for the first AC, and again on the next sync if that request failed
+                        first_ac = archive.first_accepted(contest_id, task_id)
+                        if first_ac and first_ac[1] is None:
+                            archive.set_submission_time(first_ac[0], self._api.get_submission(first_ac[0]).submited_at)
+
+                    archive.commit()
+                except (SortMeAPIException, OSError) as exc: # OSError: connection errors and timeouts of a flaky network
+                    archive.rollback() # don't let the next contest's commit pick up half of this one
+                    print(f"{dim(contest_id)} {name}: {colorama.Fore.RED}{exc}{colorama.Style.RESET_ALL}", file=sys.stderr)
+                    continue
+
+                total += new
+                print(f"{dim(contest_id)} {name}: {new}")
+
+        print(f"Новых посылок: {total}")
+
+    def history(self, args):
+        dim = lambda x: f'{colorama.Style.DIM}{x}{colorama.Style.NORMAL}'
+        bright = lambda x: f'{colorama.Style.BRIGHT}{x}{colorama.Style.NORMAL}'
+
+        def duration(seconds: int | None) -> str:
+            if seconds is None or seconds < 0:
+                return ''
+            return f'{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+
+        if not os.path.isfile(self._archive_path):
+            print('Error! Archive is empty! Run "sm sync" to fill it!', file=sys.stderr)
+            exit(1)
+
+        with Archive(self._archive_path) as archive:
+            contests: dict[tuple[int, str], list[list]] = {}
+            for contest_id, name, idx, task_name, attempts, points, attempts_to_ac, time_to_ac in archive.task_summary(args.contest_id):
+                contests.setdefault((contest_id, name), []).append([
+                    dim(chr(ord('A') + idx)),
+                    task_name,
+                    attempts,
+                    '' if points is None else points,
+                    '' if attempts_to_ac is None else attempts_to_ac,
+                    duration(time_to_ac),
+                ])
+
+            for (contest_id, name), rows in contests.items():
+                print(f"{dim(contest_id)} {bright(name)}")
+                print(tabulate(rows, headers=[dim(x) for x in ['', 'Задача', 'Посылок', 'Баллы', 'Посылок до AC', 'Время до AC']], tablefmt='rounded_grid'))
+                print()
+
+            print(dim('Вердикты:'))
+            print(tabulate(archive.verdicts(args.contest_id), headers=[dim('Вердикт'), dim('Посылок')], tablefmt='rounded_grid'))
+
+    def cache(self, args):
+        if args.action == 'clear':
+            self._cache.clear()
+            print("Cache cleared")
+
+    def search(self, args):
+        dim = lambda x: f'{colorama.Style.DIM}{x}{colorama.Style.NORMAL}'
+        bright = lambda x: f'{colorama.Style.BRIGHT}{x}{colorama.Style.NORMAL}'
+
+        query = ' '.join(args.query)
+        results = self._index.search(query, limit=args.limit, contest_id=args.contest_id)
+        if not results:
+            print('Nothing found! Statements are indexed by "sm init", "sm info" and "sm sync --full".', file=sys.stderr)
+            exit(1)
+
+        for result in results:
+            print(f"{dim(result.contest_id)} {bright(chr(ord('A') + result.idx))}. {result.name} {dim(f'{result.score:.2f}')}")
+            print(f"   {tex(snippet(result.text, query))}")
+
+
+def run_command(api: ApiWorker, args: argparse.Namespace):
+    api.configure(args)
+    try:
+        args.callback(args)
+    except NotCached as exc:
+        print(f"Error! {exc}! Run the command once without --offline first.", file=sys.stderr)
+        exit(1)
+    finally:
+        api.report(args)
+
+
+def run_daemon(api: ApiWorker, parser: argparse.ArgumentParser, args: argparse.Namespace):
+    if args.action == 'run':
+        def handler(argv: list[str]):
+            api.reload_config()
+            run_command(api, parser.parse_args(argv))
+
+        daemon.DaemonServer(handler, idle_timeout=args.idle_timeout).serve_forever()
+
+    elif args.action == 'start':
+        if daemon.start(__file__):
+            print(f"Daemon is running at {daemon.socket_path()}")
+        else:
+            print("Error! Unable to start the daemon!", file=sys.stderr)
+            exit(1)
+
+    elif args.action == 'stop':
+        if not daemon.control('stop'):
+            print("Daemon is not running")
+
+    elif args.action == 'status':
+        print(f"Daemon is running at {daemon.socket_path()}" if daemon.control('ping') else "Daemon is not running")
+
+
 def main():
     api = ApiWorker()
 
     parser = argparse.ArgumentParser()
+    parser.add_argument('--no-cache', action='store_true', help='Always ask Sort-Me, ignore cached responses')
+    parser.add_argument('--offline', action='store_true', help='Only use cached responses, never touch the network')
+    parser.add_argument('--trace', action='store_true', help='Print where the time went (requests, compilation, tests)')
+    parser.add_argument('--trace-file', help='Write a Chrome trace (chrome://tracing, ui.perfetto.dev) to this file')
     subparsers = parser.add_subparsers(required=True)
 
     # fetch_parser = subparsers.add_parser('list')
@@ -569,6 +1250,9 @@ def main():
 
     fetch_parser = subparsers.add_parser('init', help='Initialize the folder')
     fetch_parser.add_argument('contest_id', type=int, help='Contst id taken from the URL')
+    fetch_parser.add_argument('-w', '--wait', action='store_true', help='Wait for the contest to start, then initialize and create every task from the template')
+    fetch_parser.add_argument('-c', '--create', action='store_true', help='Create every task from the template')
+    fetch_parser.add_argument('--template-path', help='Template to use instead of the configured one')
     fetch_parser.set_defaults(callback=api.init)
 
     push_parser = subparsers.add_parser('push', aliases=['p'], help='Push your solution to Sort-Me')
@@ -577,8 +1261,10 @@ def main():
     push_parser.set_defaults(callback=api.push)
 
     push_parser = subparsers.add_parser('test', aliases=['t'], help='Test your solution with given tests')
-    push_parser.add_argument('filename', help='Filename or task id to test')
+    push_parser.add_argument('filename', nargs='?', help='Filename or task id to test')
     push_parser.add_argument('-t', '--task-id', help='Optionally specify task id')
+    push_parser.add_argument('-a', '--all', action='store_true', help='Build and test every task of the contest in parallel')
+    push_parser.add_argument('-j', '--jobs', type=positive_int, help='Parallel jobs for --all (default: number of CPUs)')
     push_parser.set_defaults(callback=api.test)
 
     submission_parser = subparsers.add_parser('submissions', aliases=['sub'], help='List your submissions')
@@ -606,8 +1292,51 @@ def main():
     create_parser.add_argument('template_path', help='Optional path to template', nargs='?')
     create_parser.set_defaults(callback=api.create)
 
+    profile_parser = subparsers.add_parser('profile', aliases=['prof'], help='Show where your solution spends its time on the heaviest test (gprof)')
+    profile_parser.add_argument('filename', help='Filename or task id to profile')
+    profile_parser.add_argument('-t', '--task-id', help='Optionally specify task id')
+    profile_parser.add_argument('-n', '--test', type=int, help='Test to run (1-based), the one with the largest input by default')
+    profile_parser.add_argument('-r', '--repeat', type=positive_int, default=1, help='Run the test several times and sum the samples')
+    profile_parser.add_argument('--top', type=int, default=15, help='How many functions and lines to show')
+    profile_parser.add_argument('--inline', action='store_true', help='Let the compiler inline functions (faster, but less detailed report)')
+    profile_parser.set_defaults(callback=api.profile)
+
+    compare_parser = subparsers.add_parser('compare', aliases=['cmp'], help='Compare the speed of two solutions on the same tests')
+    compare_parser.add_argument('first', help='Baseline solution (A)')
+    compare_parser.add_argument('second', help='Candidate solution (B)')
+    compare_parser.add_argument('-t', '--task-id', help='Optionally specify task id')
+    compare_parser.add_argument('-r', '--repeat', type=positive_int, default=10, help='Measured runs per test and solution')
+    compare_parser.add_argument('-w', '--warmup', type=non_negative_int, default=1, help='Unmeasured runs before that')
+    compare_parser.add_argument('--cpu', type=int, help='Pin both solutions to this CPU core')
+    compare_parser.add_argument('--alpha', type=float, default=0.05, help='Significance level')
+    compare_parser.set_defaults(callback=api.compare)
+
+    sync_parser = subparsers.add_parser('sync', help='Download your contests, tasks and submissions into the local archive')
+    sync_parser.add_argument('contest_id', type=int, nargs='?', help='Only sync this contest')
+    sync_parser.add_argument('--full', action='store_true', help='Re-download everything instead of only new submissions')
+    sync_parser.set_defaults(callback=api.sync)
+
+    history_parser = subparsers.add_parser('history', aliases=['h'], help='Attempts, time to AC and verdicts from the local archive')
+    history_parser.add_argument('contest_id', type=int, nargs='?', help='Only show this contest')
+    history_parser.set_defaults(callback=api.history)
+
+    search_parser = subparsers.add_parser('search', aliases=['s'], help='Full-text search over the statements of every contest you have opened')
+    search_parser.add_argument('query', nargs='+')
+    search_parser.add_argument('-n', '--limit', type=int, default=10, help='Number of results')
+    search_parser.add_argument('-c', '--contest', dest='contest_id', type=int, help='Only search this contest')
+    search_parser.set_defaults(callback=api.search)
+
+    cache_parser = subparsers.add_parser('cache', help='Manage the cache of Sort-Me responses')
+    cache_parser.add_argument('action', choices=['clear'])
+    cache_parser.set_defaults(callback=api.cache)
+
+    daemon_parser = subparsers.add_parser('daemon', help='Manage the background process that keeps the API connection warm')
+    daemon_parser.add_argument('action', choices=['start', 'stop', 'status', 'run'])
+    daemon_parser.add_argument('--idle-timeout', type=float, default=daemon.IDLE_TIMEOUT, help='Seconds without requests before the daemon exits')
+    daemon_parser.set_defaults(callback=functools.partial(run_daemon, api, parser))
+
     args = parser.parse_args()
-    args.callback(args)
+    run_command(api, args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+import sqlite3
+import time
+
+from collections.abc import Iterable
+
+from .types import ContestTask, ShortSubmission
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS contests (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    starts INTEGER,
+    ends INTEGER,
+    synced_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    contest_id INTEGER NOT NULL REFERENCES contests(id),
+    id INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    main_description TEXT,
+    in_description TEXT,
+    out_description TEXT,
+    comment TEXT,
+    time_limit_milliseconds INTEGER,
+    memory_limit_megabytes INTEGER,
+    tests_updated INTEGER,
+    solved_by INTEGER,
+    PRIMARY KEY (contest_id, id)
+);
+
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY,
+    contest_id INTEGER NOT NULL,
+    task_id INTEGER NOT NULL,
+    shown_verdict INTEGER,
+    shown_verdict_text TEXT,
+    total_points INTEGER,
+    shown_test INTEGER,
+    submited_at INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS submissions_by_task ON submissions (contest_id, task_id, id);
+CREATE INDEX IF NOT EXISTS submissions_by_verdict ON submissions (shown_verdict_text);
+'''
+
+
+class Archive:
+    _db: sqlite3.Connection
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def save_contest(self, contest_id: int, name: str, starts: int | None, ends: int | None):
+        self._db.execute(
+            'INSERT INTO contests (id, name, starts, ends, synced_at) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET name = excluded.name, starts = excluded.starts, ends = excluded.ends, synced_at = excluded.synced_at',
+            (contest_id, name, starts, ends, time.time()),
+        )
+
+    def save_tasks(self, contest_id: int, tasks: Iterable[ContestTask]):
+        self._db.executemany(
+            'INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(
+                contest_id, task.id, idx, task.name, task.main_description, task.in_description, task.out_description,
+                task.comment, task.time_limit_milliseconds, task.memory_limit_megabytes, task.tests_updated, task.solved_by,
+            ) for idx, task in enumerate(tasks)],
+        )
+
+    def has_tasks(self, contest_id: int) -> bool:
+        return self._db.execute('SELECT 1 FROM tasks WHERE contest_id = ? LIMIT 1', (contest_id,)).fetchone() is not None
+
+    def task_ids(self, contest_id: int) -> list[int]:
+        return [row[0] for row in self._db.execute('SELECT id FROM tasks WHERE contest_id = ? ORDER BY idx', (contest_id,))]
+
+    def newest_submission(self, contest_id: int, task_id: int) -> int:
+        row = self._db.execute('SELECT MAX(id) FROM submissions WHERE contest_id = ? AND task_id = ?', (contest_id, task_id)).fetchone()
+        return row[0] or 0
+
+    def save_submissions(self, contest_id: int, task_id: int, submissions: Iterable[ShortSubmission]):
+        self._db.executemany(
+            'INSERT INTO submissions (id, contest_id, task_id, shown_verdict, shown_verdict_text, total_points, shown_test) VALUES (?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET shown_verdict = excluded.shown_verdict, shown_verdict_text = excluded.shown_verdict_text, '
+            'total_points = excluded.total_points, shown_test = excluded.shown_test',
+            [(s.id, contest_id, task_id, s.shown_verdict, s.shown_verdict_text, s.total_points, s.shown_test) for s in submissions],
+        )
+
+    def first_accepted(self, contest_id: int, task_id: int) -> tuple[int, int | None] | None:
+        # (id, submited_at) of the first AC, submited_at is only filled in by `set_submission_time`
+        return self._db.execute(
+            'SELECT id, submited_at FROM submissions WHERE contest_id = ? AND task_id = ? AND total_points = 100 ORDER BY id LIMIT 1',
+            (contest_id, task_id),
+        ).fetchone()
+
+    def set_submission_time(self, submission_id: int, submited_at: int):
+        self._db.execute('UPDATE submissions SET submited_at = ? WHERE id = ?', (submited_at, submission_id))
+
+    def task_summary(self, contest_id: int | None = None) -> list[tuple]:
+        # contest, task letter, task name, attempts, best score, attempts until the first AC, seconds from the start to it
+        return self._db.execute('''
+            WITH first_ac AS (
+                SELECT contest_id, task_id, MIN(id) AS id FROM submissions WHERE total_points = 100 GROUP BY contest_id, task_id
+            )
+            SELECT
+                c.id, c.name, t.idx, t.name,
+                COUNT(s.id),
+                MAX(s.total_points),
+                CASE WHEN a.id IS NULL THEN NULL ELSE SUM(CASE WHEN s.id <= a.id THEN 1 ELSE 0 END) END,
+                (SELECT submited_at FROM submissions WHERE id = a.id) - c.starts
+            FROM tasks t
+            JOIN contests c ON c.id = t.contest_id
+            LEFT JOIN submissions s ON s.contest_id = t.contest_id AND s.task_id = t.id
+            LEFT JOIN first_ac a ON a.contest_id = t.contest_id AND a.task_id = t.id
+            WHERE ?1 IS NULL OR c.id = ?1
+            GROUP BY t.contest_id, t.id
+            ORDER BY c.starts, c.id, t.idx
+        ''', (contest_id,)).fetchall()
+
+    def verdicts(self, contest_id: int | None = None) -> list[tuple[str, int]]:
+        return self._db.execute('''
+            SELECT shown_verdict_text, COUNT(*) FROM submissions
+            WHERE ?1 IS NULL OR contest_id = ?1
+            GROUP BY shown_verdict_text
+            ORDER BY COUNT(*) DESC
+        ''', (contest_id,)).fetchall()
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import time
+
+from dataclasses import dataclass
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+@dataclass
+class CachePolicy:
+    ttl: float
+    revalidate: bool = False # send If-None-Match/If-Modified-Since instead of a blind refetch
+
+
+# endpoints missing here (submit and friends) are never cached
+POLICIES: dict[str, CachePolicy] = {
+    'getContestTasks': CachePolicy(ttl=6 * 60 * 60, revalidate=True),
+    'getContestById': CachePolicy(ttl=60 * 60, revalidate=True),
+    'getHistoryOfContests': CachePolicy(ttl=60 * 60, revalidate=True),
+    'GetUpcomingContests': CachePolicy(ttl=5 * 60),
+    'getSubmissionInfo': CachePolicy(ttl=60),
+    'getMySubmissionsByTask': CachePolicy(ttl=5),
+    'getContestTable': CachePolicy(ttl=5),
+}
+
+_KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    status_code: int
+    headers: dict[str, str]
+    body: str
+    stored_at: float
+
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def to_response(self) -> requests.Response:
+        r = requests.Response()
+        r.url = self.url
+        r.status_code = self.status_code
+        r.headers = CaseInsensitiveDict(self.headers)
+        r._content = self.body.encode('utf-8')
+        r.encoding = 'utf-8'
+        return r
+
+    def validators(self) -> dict[str, str]:
+        out = {}
+        if 'ETag' in self.headers:
+            out['If-None-Match'] = self.headers['ETag']
+        if 'Last-Modified' in self.headers:
+            out['If-Modified-Since'] = self.headers['Last-Modified']
+        return out
+
+
+class ResponseCache:
+    _path: str
+    _memory: dict[str, CacheEntry]
+    max_entries: int
+    max_bytes: int
+    enabled: bool
+
+    def __init__(self, path: str, max_entries: int = 512, max_bytes: int = 32 * 1024 * 1024):
+        self._path = path
+        self._memory = {}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = True
+
+    @staticmethod
+    def policy(request_method: str, method: str) -> CachePolicy | None:
+        if request_method != 'GET':
+            return None
+        return POLICIES.get(method)
+
+    @staticmethod
+    def key(api_key: str, method: str, params: dict | None) -> str:
+        raw = json.dumps([api_key, method, sorted((params or {}).items())], default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self._path, key + '.json')
+
+    def get(self, key: str) -> CacheEntry | None:
+        if key in self._memory:
+            return self._memory[key]
+
+        try:
+            with open(self._file(key)) as f:
+                entry = CacheEntry(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+        os.utime(self._file(key)) # mtime doubles as the LRU clock
+        self._memory[key] = entry
+        return entry
+
+    def put(self, key: str, r: requests.Response) -> CacheEntry:
+        entry = CacheEntry(
+            url=r.url,
+            status_code=r.status_code,
+            headers={name: r.headers[name] for name in _KEPT_HEADERS if name in r.headers},
+            body=r.text,
+            stored_at=time.time(),
+        )
+        self._store(key, entry)
+        return entry
+
+    def touch(self, key: str, entry: CacheEntry) -> CacheEntry: # revalidated with a 304
+        entry.stored_at = time.time()
+        self._store(key, entry)
+        return entry
+
+    def _store(self, key: str, entry: CacheEntry):
+        self._memory[key] = entry
+        # submitted code and standings live in here, keep them to ourselves (the chmod covers directories
+        # left behind by older versions with the default umask)
+        os.makedirs(self._path, mode=0o700, exist_ok=True)
+        os.chmod(self._path, 0o700)
+
+        tmp = self._file(key) + '.tmp'
+        with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+            json.dump(entry.__dict__, f)
+        os.replace(tmp, self._file(key))
+
+        self._evict()
+
+    def _evict(self):
+        files = []
+        total = 0
+        for entry in os.scandir(self._path):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        files.sort()
+        while files and (len(files) > self.max_entries or total > self.max_bytes):
+            _, size, path = files.pop(0)
+            total -= size
+            self._memory.pop(os.path.basename(path).removesuffix('.json'), None)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        self._memory.clear()
+        if os.path.isdir(self._path):
+            for entry in os.scandir(self._path):
+                os.remove(entry.path)
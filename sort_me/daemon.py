@@ -0,0 +1,305 @@
+import io
+import json
+import os
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import time
+import traceback
+
+from collections.abc import Callable
+
+# NOTE: this module is imported before the network stack on every `sm` call, keep it light
+
+IDLE_TIMEOUT = 15 * 60
+SPAWN_TIMEOUT = 10
+
+# commands that don't need a terminal (no prompts, no editors, no compilers writing to the tty) and finish quickly:
+# the daemon serves one request at a time, so `push` waiting for a verdict or a full `sync` would hold up the rest
+FORWARDED_COMMANDS = {'init', 'submissions', 'sub', 'contest', 'ct', 'stat', 'st', 'info', 'i', 'search', 's', 'cache'}
+
+_EXIT, _STDOUT, _STDERR = 0, 1, 2
+_HEADER = struct.Struct('!BI')
+_EXIT_CODE = struct.Struct('!i')
+
+
+def socket_path() -> str:
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or f'/tmp/sortme-{os.getuid()}'
+    return os.path.join(runtime_dir, 'sortme.sock')
+
+
+def _private_dir(path: str) -> bool:
+    # /tmp is shared: a directory somebody else created (or can write to) could hold their socket, which would then
+    # receive our argv and cwd and answer with whatever it likes
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return False
+
+    st = os.lstat(path)
+    return stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+
+def _peer_uid(sock: socket.socket) -> int:
+    _, uid, _ = struct.unpack('3i', sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i')))
+    return uid
+
+
+def config_path() -> str:
+    data_path = os.environ.get('XDG_DATA_HOME') or os.environ['HOME'] + "/.local/share"
+    return data_path + "/sortme_config.json"
+
+
+def enabled() -> bool:
+    if 'SORTME_DAEMON' in os.environ:
+        return os.environ['SORTME_DAEMON'] not in ('', '0')
+
+    if not os.path.isfile(config_path()):
+        return False # first run, authorization has to happen in the foreground
+
+    with open(config_path()) as config_file:
+        return bool(json.load(config_file).get('daemon'))
+
+
+# global flags that take a value, see main.py
+_VALUE_OPTIONS = {'--trace-file'}
+
+
+def forwardable(argv: list[str]) -> bool:
+    command = None
+    skip = False
+    for arg in argv: # skip global flags like --offline
+        if skip:
+            skip = False
+        elif arg in _VALUE_OPTIONS:
+            skip = True
+        elif not arg.startswith('-'):
+            command = arg
+            break
+    # `init --wait` can block for hours, it would hold up every other command in the daemon
+    blocking = command == 'init' and ('-w' in argv or '--wait' in argv)
+    return command in FORWARDED_COMMANDS and not blocking and '-h' not in argv and '--help' not in argv
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes | None:
+    buf = b''
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return buf
+
+
+def _connect() -> socket.socket | None:
+    path = socket_path()
+    if not _private_dir(os.path.dirname(path)):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        if _peer_uid(sock) != os.getuid():
+            raise PermissionError(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _spawn(entrypoint: str) -> socket.socket | None:
+    subprocess.Popen(
+        [sys.executable, entrypoint, 'daemon', 'run'],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+    deadline = time.monotonic() + SPAWN_TIMEOUT
+    while time.monotonic() < deadline:
+        sock = _connect()
+        if sock:
+            return sock
+        time.sleep(0.02)
+    return None
+
+
+def _request(sock: socket.socket, request: dict) -> int:
+    sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+
+    outputs = {_STDOUT: sys.stdout.buffer, _STDERR: sys.stderr.buffer}
+    while True:
+        header = _recv_exact(sock, _HEADER.size)
+        if header is None:
+            print('Error! Daemon connection closed unexpectedly!', file=sys.stderr)
+            return 1
+
+        channel, size = _HEADER.unpack(header)
+        payload = _recv_exact(sock, size) if size else b''
+        if payload is None:
+            print('Error! Daemon connection closed unexpectedly!', file=sys.stderr)
+            return 1
+
+        if channel == _EXIT:
+            return _EXIT_CODE.unpack(payload)[0]
+
+        outputs[channel].write(payload)
+        outputs[channel].flush()
+
+
+def forward(argv: list[str], entrypoint: str) -> int | None: # None means "run it yourself"
+    sock = _connect() or _spawn(entrypoint)
+    if not sock:
+        return None
+
+    with sock:
+        return _request(sock, {'argv': argv, 'cwd': os.getcwd()})
+
+
+def start(entrypoint: str) -> bool:
+    sock = _connect() or _spawn(entrypoint)
+    if not sock:
+        return False
+
+    sock.close()
+    return True
+
+
+def control(command: str) -> bool:
+    sock = _connect()
+    if not sock:
+        return False
+
+    with sock:
+        _request(sock, {'control': command})
+    return True
+
+
+class _FrameWriter(io.RawIOBase):
+    _conn: socket.socket
+    _channel: int
+    closed_by_peer: bool
+
+    def __init__(self, conn: socket.socket, channel: int):
+        self._conn = conn
+        self._channel = channel
+        self.closed_by_peer = False
+
+    def writable(self):
+        return True
+
+    def write(self, b) -> int:
+        if not self.closed_by_peer:
+            try:
+                self._conn.sendall(_HEADER.pack(self._channel, len(b)) + bytes(b))
+            except OSError: # client went away (^C), let the command finish quietly
+                self.closed_by_peer = True
+        return len(b)
+
+
+class DaemonServer:
+    _handler: Callable[[list[str]], None]
+    _idle_timeout: float
+    _running: bool
+
+    def __init__(self, handler: Callable[[list[str]], None], idle_timeout: float = IDLE_TIMEOUT):
+        self._handler = handler
+        self._idle_timeout = idle_timeout
+        self._running = False
+
+    def _bind(self) -> socket.socket | None:
+        path = socket_path()
+        if not _private_dir(os.path.dirname(path)):
+            return None
+
+        if os.path.lexists(path):
+            probe = _connect()
+            if probe: # someone was faster
+                probe.close()
+                return None
+            os.remove(path) # stale socket of a dead daemon
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            sock.bind(path)
+        except OSError:
+            sock.close()
+            return None
+        finally:
+            os.umask(old_umask)
+
+        sock.listen(16)
+        sock.settimeout(self._idle_timeout)
+        return sock
+
+    def _run(self, conn: socket.socket, argv: list[str]) -> int:
+        stdout = io.TextIOWrapper(_FrameWriter(conn, _STDOUT), encoding='utf-8', write_through=True)
+        stderr = io.TextIOWrapper(_FrameWriter(conn, _STDERR), encoding='utf-8', write_through=True)
+        old_stdout, old_stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = stdout, stderr
+
+        try:
+            self._handler(argv)
+            return 0
+        except SystemExit as exc:
+            if exc.code is None or isinstance(exc.code, int):
+                return exc.code or 0
+            print(exc.code, file=sys.stderr)
+            return 1
+        except Exception:
+            traceback.print_exc()
+            return 1
+        finally:
+            sys.stdout, sys.stderr = old_stdout, old_stderr
+
+    def _serve(self, conn: socket.socket):
+        with conn.makefile('rb') as reader:
+            line = reader.readline()
+        if not line:
+            return
+
+        request = json.loads(line)
+        if 'control' in request:
+            if request['control'] == 'stop':
+                self._running = False
+            code = 0
+        else:
+            cwd = os.getcwd()
+            try:
+                os.chdir(request['cwd'])
+                code = self._run(conn, request['argv'])
+            finally:
+                os.chdir(cwd)
+
+        try:
+            conn.sendall(_HEADER.pack(_EXIT, _EXIT_CODE.size) + _EXIT_CODE.pack(code))
+        except OSError:
+            pass
+
+    def serve_forever(self):
+        sock = self._bind()
+        if not sock:
+            return
+
+        path = socket_path()
+        self._running = True
+        try:
+            while self._running:
+                try:
+                    conn, _ = sock.accept()
+                except socket.timeout: # idle for too long
+                    break
+
+                with conn:
+                    conn.settimeout(None)
+                    self._serve(conn)
+        finally:
+            sock.close()
+            if os.path.exists(path):
+                os.remove(path)
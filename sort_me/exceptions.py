@@ -10,3 +10,9 @@ class RequestException(SortMeAPIException):
 
 class TooManyRequests(SortMeAPIException):
     pass
+
+class ModelDecodeError(SortMeAPIException):
+    pass
+
+class NotCached(RequestException):
+    pass
@@ -1,15 +1,24 @@
 import base64
 import json
+import os
 import re
 import time
 
 from collections.abc import Generator
 
 import requests
+import websockets.exceptions
 import websockets.sync.client
 
+from .cache import ResponseCache
+from .search import SearchIndex
+from .trace import tracer
 from .types import *
-from .exceptions import RequestException, TooManyRequests
+from .exceptions import NotCached, RequestException, TooManyRequests
+
+# overridable to point the CLI at a stand-in server, see benchmarks/fake_server.py
+API_URL = os.environ.get('SORTME_API_URL', 'https://api.sort-me.org')
+WS_URL = os.environ.get('SORTME_WS_URL', API_URL.replace('http', 'ws', 1))
 
 class AuthProvider:
     _session: requests.Session
@@ -60,109 +69,242 @@ class AuthProvider:
 
 class SortMeAPI:
     _api_key: str
-    client: ...
+    _session: requests.Session
+    cache: ResponseCache | None
+    offline: bool
 
-    def __init__(self, api_key: str):
+    STALE_TIMEOUT = 5 # don't wait on a slow network when there is something to show already
+    GET_RETRIES = 3 # on 429
+    WS_RECONNECTS = 4
+    POLL_INTERVAL = 1
+    POLL_MAX_INTERVAL = 10
+    POLL_TIMEOUT = 5
+
+    def __init__(self, api_key: str, cache: ResponseCache | None = None, index: SearchIndex | None = None):
         self._api_key = api_key
+        self._session = requests.Session() # keeps the TLS connection alive between requests
+        self.cache = cache
+        self.index = index # every statement that passes through here ends up searchable
+        self.offline = False
+
+    def _connections(self) -> int: # opened so far, over every pool of the session
+        pools = self._session.get_adapter(API_URL).poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
 
-    def _make_request(self, request_method: RequestMethod, method: str, *args, **kwargs):
+    def _send(self, request_method: RequestMethod, method: str, *args, **kwargs):
         if 'headers' not in kwargs:
             kwargs['headers'] = {}
         kwargs['headers']['Authorization'] = f'Bearer {self._api_key}'
 
-        r = requests.request(request_method, f'https://api.sort-me.org/{method}', *args, **kwargs)
+        with tracer.span(method, 'http', method=request_method) as span:
+            # requests can't time DNS/TLS on their own, but the pool knows whether it had to open a connection,
+            # and when it did, `ttfb_ms` includes the handshake
+            connections = self._connections()
+
+            r = self._session.request(request_method, f'{API_URL}/{method}', *args, **kwargs)
+
+            for attempt in range(self.GET_RETRIES if request_method == 'GET' else 0): # only safe to repeat reads
+                if r.status_code != 429:
+                    break
+                span.add('retries')
+                retry_after = r.headers.get('Retry-After', '')
+                time.sleep(int(retry_after) if retry_after.isdigit() else 0.5 * 2 ** attempt)
+                r = self._session.request(request_method, f'{API_URL}/{method}', *args, **kwargs)
 
-        if r.status_code > 300:
+            span.set(status=r.status_code, bytes=len(r.content), ttfb_ms=r.elapsed.total_seconds() * 1000)
+            span.add('connects', self._connections() - connections)
+
+        if r.status_code > 300 and r.status_code != 304:
             if r.status_code == 429:
                 raise TooManyRequests(r.text, r.status_code)
-            raise RequestException(r.json()['error'], r.status_code)
+            try:
+                error = r.json()['error']
+            except (ValueError, KeyError, TypeError): # a gateway's HTML page rather than Sort-Me's JSON
+                error = r.reason or r.text[:200]
+            raise RequestException(error, r.status_code)
 
         return r
 
+    def _make_request(self, request_method: RequestMethod, method: str, *args, max_age: float | None = None, fresh: bool = False, **kwargs):
+        # `fresh` always asks Sort-Me and never falls back to a stale entry, the response is still cached
+        policy = self.cache.policy(request_method, method) if self.cache and self.cache.enabled else None
+
+        if not policy:
+            if self.offline:
+                raise NotCached(f'{method} is not available offline')
+            return self._send(request_method, method, *args, **kwargs)
+
+        assert self.cache
+        key = self.cache.key(self._api_key, f'{API_URL}/{method}', kwargs.get('params'))
+        entry = None if fresh else self.cache.get(key)
+
+        if entry and (self.offline or entry.age() < (policy.ttl if max_age is None else max_age)):
+            with tracer.span(method, 'cache', bytes=len(entry.body)):
+                return entry.to_response()
+
+        if self.offline:
+            raise NotCached(f'{method} is not cached, unable to run offline')
+
+        if entry:
+            if kwargs.get('timeout') is None:
+                kwargs['timeout'] = self.STALE_TIMEOUT
+            if policy.revalidate:
+                kwargs['headers'] = {**kwargs.get('headers', {}), **entry.validators()}
+
+        try:
+            r = self._send(request_method, method, *args, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if entry:
+                with tracer.span(method, 'cache', bytes=len(entry.body), stale=True):
+                    return entry.to_response()
+            raise
+
+        if r.status_code == 304 and entry:
+            return self.cache.touch(key, entry).to_response()
+
+        return self.cache.put(key, r).to_response()
+
     def get_contests(self) -> list[VerboseContestInfo]:
-        contests: list[UpcomingContest] = self._make_request('GET', 'GetUpcomingContests').json()
-        return [self._make_request('GET', 'getContestById', params={"id": contest['id']}).json() for contest in contests]
+        contests = [UpcomingContest.from_dict(contest) for contest in self._make_request('GET', 'GetUpcomingContests').json()]
+        return [VerboseContestInfo.from_dict(self._make_request('GET', 'getContestById', params={"id": contest.id}).json()) for contest in contests]
+
+    def get_contest_info(self, contest_id: int, max_age: float | None = None, fresh: bool = False, timeout: float | None = None) -> VerboseContestInfo:
+        r = self._make_request('GET', 'getContestById', params={'id': contest_id}, max_age=max_age, fresh=fresh, timeout=timeout)
+        return VerboseContestInfo.from_dict(r.json())
 
-    def get_contest_tasks(self, contest_id: int) -> list[ContestTask]:
-        raw = self._make_request('GET', 'getContestTasks', params={'id': contest_id}).json()
-        return list(map(ContestTask.from_dict, raw['tasks']))
+    def get_contest_tasks(self, contest_id: int, max_age: float | None = None, fresh: bool = False, timeout: float | None = None) -> list[ContestTask]:
+        raw = self._make_request('GET', 'getContestTasks', params={'id': contest_id}, max_age=max_age, fresh=fresh, timeout=timeout).json()
+        tasks = list(map(ContestTask.from_dict, raw['tasks']))
+        if self.index:
+            self.index.add_tasks(contest_id, tasks)
+        return tasks
 
     def get_contest_task(self, contest_id: int, idx: int) -> ContestTask:
-        raw = self._make_request('GET', 'getContestTasks', params={'id': contest_id}).json()
-        return ContestTask.from_dict(raw['tasks'][idx])
+        return self.get_contest_tasks(contest_id)[idx]
 
     def get_task_stats(self, task_id: int) -> Generator[int | BaseSubmission, None, None]:
-        with websockets.sync.client.connect(f"wss://api.sort-me.org/ws/submission?id={task_id}&token={self._api_key}") as websocket:
-            for message in map(str, websocket):
-                if message.isnumeric():
-                    yield int(message)
-                else:
-                    yield json.loads(message)
-
-    def get_contest_history(self) -> list:
+        # `task_id` is the submission id. The websocket is reconnected with backoff if it drops, and if it can't be
+        # kept alive the verdict is polled from getSubmissionInfo instead, so an accepted submission is never lost.
+        start = time.perf_counter()
+
+        with tracer.span('ws/submission', 'ws', submission_id=task_id) as span:
+            first_message = True
+
+            def received(message: int | BaseSubmission):
+                nonlocal first_message
+                span.add('messages')
+                if first_message:
+                    first_message = False
+                    span.set(first_message_ms=(time.perf_counter() - start) * 1000)
+                if isinstance(message, BaseSubmission) and message.completed:
+                    span.set(verdict_ms=(time.perf_counter() - start) * 1000)
+
+            for attempt in range(self.WS_RECONNECTS + 1):
+                if attempt:
+                    span.add('reconnects')
+                    time.sleep(min(0.25 * 2 ** (attempt - 1), 2))
+
+                try:
+                    with tracer.span('connect', 'ws'):
+                        websocket = websockets.sync.client.connect(
+                            f"{WS_URL}/ws/submission?id={task_id}&token={self._api_key}",
+                            ping_interval=5,
+                            ping_timeout=5, # notice a dead Wi-Fi in seconds, not minutes
+                        )
+
+                    with websocket:
+                        for raw in map(str, websocket):
+                            span.add('bytes', len(raw))
+                            message = int(raw) if raw.isnumeric() else BaseSubmission.from_dict(json.loads(raw))
+                            received(message)
+                            yield message
+                            if isinstance(message, BaseSubmission) and message.completed:
+                                return
+                    break # closed by the server without a final verdict, ask for it below
+                except (websockets.exceptions.WebSocketException, OSError):
+                    continue
+
+            span.set(polling=True)
+            failures = 0
+            while True:
+                try:
+                    message = self.get_submission(task_id, max_age=0, timeout=self.POLL_TIMEOUT)
+                except (TooManyRequests, RequestException, requests.RequestException) as exc:
+                    # still offline, rate limited or the server is having a bad time: keep trying, the verdict will come
+                    if isinstance(exc, RequestException) and (exc.status_code or 0) < 500:
+                        raise
+                    span.add('poll_failures')
+                    time.sleep(min(self.POLL_INTERVAL * 2 ** failures, self.POLL_MAX_INTERVAL))
+                    failures += 1
+                    continue
+
+                failures = 0
+                received(message)
+                yield message
+                if message.completed:
+                    return
+                time.sleep(self.POLL_INTERVAL)
+
+    def get_contest_history(self) -> list[VerboseContestInfo]:
         raw = self._make_request('GET', 'getHistoryOfContests').json()['contests']
-        return raw
+        return list(map(VerboseContestInfo.from_dict, raw))
+
+    def get_submission_history(self, contest_id: int, task_id: int, limit = 0, stop_at = 0) -> tuple[int, list[ShortSubmission]]:
+        # `stop_at` is the newest submission id that is already known, only newer ones are returned
+        r = SubmissionHistory.from_dict(self._make_request('GET', 'getMySubmissionsByTask', params={'id': task_id, 'contestid': contest_id}).json())
+        submissions = r.submissions
+        total_count = r.count
 
-    def get_submission_history(self, contest_id: int, task_id: int, limit = 0) -> tuple[int, list[ShortSubmission | ShortSubmissionBase]]:
-        r = self._make_request('GET', 'getMySubmissionsByTask', params={'id': task_id, 'contestid': contest_id}).json()
-        submissions: list[ShortSubmission | ShortSubmissionBase] = r['submissions']
-        total_count: int = r['count']
+        if stop_at and submissions and submissions[-1].id <= stop_at:
+            return total_count, [submission for submission in submissions if submission.id > stop_at]
 
         if total_count < 10:
             return total_count, submissions
 
         for count in range(10, total_count, 10): # you CAN NOT async this, offset is STRICTLY absolute, there is NO WAY to optimize this...
-            raw = self._make_request('GET', 'getMySubmissionsByTask', params={
+            raw = SubmissionHistory.from_dict(self._make_request('GET', 'getMySubmissionsByTask', params={
                 'id': task_id,
-                "offset": submissions[-1]['id'],
+                "offset": submissions[-1].id,
                 'contestid': contest_id
-            }).json()
+            }).json())
 
-            submissions.extend(raw['submissions'])
+            submissions.extend(raw.submissions)
+
+            if stop_at and submissions and submissions[-1].id <= stop_at:
+                return total_count, [submission for submission in submissions if submission.id > stop_at]
 
             if limit and limit < count:
                 return total_count, submissions[:limit]
 
         return total_count, submissions
 
-    def get_submission_info(self, contest_id: int, task_id: int, submission_id: int | None): # TODO: Typing
+    def get_submission_info(self, contest_id: int, task_id: int, submission_id: int | None) -> VerboseSubmission:
         id = -1
 
         if submission_id:
-            id = self.get_submission_history(contest_id, task_id, limit=submission_id + 1)[1][submission_id]['id']
+            id = self.get_submission_history(contest_id, task_id, limit=submission_id + 1)[1][submission_id].id
         else:
             submissions = self.get_submission_history(contest_id, task_id)[1]
             for submission in submissions:
-                if 'total_points' in submission and submission['total_points'] == 100:
-                    id = submission['id']
+                if submission.total_points == 100:
+                    id = submission.id
                     break
             if id == -1:
-                id = submissions[0]['id']
+                id = submissions[0].id
 
         if id == -1:
             raise RuntimeError("No suitable submission ID found!")
 
-        r = self._make_request('GET', 'getSubmissionInfo', params={'id': id}).json()
-        return r
-
-    def get_contest(self, contest_id: int): # TODO: Typing
-        r = self._make_request("GET", 'getContestTasks', params={'id': contest_id}).json()
-        out = {
-            'name': r['name'],
-            'status': r['status'],
-            'ends': r['ends'] if 'ends' in r else -1,
-            'tasks': [task['name'] for task in r['tasks']],
-        }
+        return self.get_submission(id)
 
-        r = self._make_request('GET', 'getContestTable', params={'contestid': contest_id, 'page': 1, 'label': 0}).json()['you']
-        out.update({
-            'place': r['place'],
-            'results': r['results'],
-            'sum': r['sum'],
-            'time': r['time']
-        })
+    def get_submission(self, id: int, max_age: float | None = None, timeout: float | None = None) -> VerboseSubmission:
+        r = self._make_request('GET', 'getSubmissionInfo', params={'id': id}, max_age=max_age, timeout=timeout).json()
+        return VerboseSubmission.from_dict(r)
 
-        return out
+    def get_contest(self, contest_id: int) -> ContestInfoNew:
+        r = self._make_request("GET", 'getContestTasks', params={'id': contest_id}).json()
+        table = self._make_request('GET', 'getContestTable', params={'contestid': contest_id, 'page': 1, 'label': 0}).json()
+        return ContestInfoNew.from_dict({**r, 'you': table['you']})
 
     def upload_code(self, code: str, contest_id: int | None, task_id: int, lang: Lang = 'c++') -> int:
         return self._make_request('POST', 'submit', json={
@@ -0,0 +1,175 @@
+import hashlib
+import math
+import re
+import sqlite3
+
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from .stem import stem
+from .types import ContestTask
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    contest_id INTEGER NOT NULL,
+    task_id INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    text TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    UNIQUE (contest_id, task_id)
+);
+
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS postings_by_doc ON postings (doc_id);
+'''
+
+# BM25 parameters, the usual defaults
+K1 = 1.2
+B = 0.75
+
+# bump when `tokenize` changes, the postings are then rebuilt from the stored statements
+TOKENIZER_VERSION = 2
+
+_WORD = re.compile(r'\w+')
+_TEX_COMMAND = re.compile(r'\\[a-zA-Z]+')
+
+
+def tokenize(text: str) -> list[str]: # lowercased words without TeX commands, russian ones stemmed (see stem.py)
+    return [stem(word) for word in _WORD.findall(_TEX_COMMAND.sub(' ', text).lower())]
+
+
+@dataclass(slots=True)
+class SearchResult:
+    contest_id: int
+    task_id: int
+    idx: int
+    name: str
+    text: str
+    score: float
+
+
+class SearchIndex:
+    _path: str
+    _db: sqlite3.Connection | None
+
+    def __init__(self, path: str):
+        self._path = path
+        self._db = None # opened on first use, most commands never touch the index
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(self._path)
+            self._db.executescript(SCHEMA)
+            if self._db.execute('PRAGMA user_version').fetchone()[0] != TOKENIZER_VERSION:
+                self._reindex()
+        return self._db
+
+    def _reindex(self):
+        assert self._db
+        self._db.execute('DELETE FROM postings')
+        for doc_id, text in self._db.execute('SELECT id, text FROM docs').fetchall():
+            terms = Counter(tokenize(text))
+            self._db.execute('UPDATE docs SET length = ? WHERE id = ?', (sum(terms.values()), doc_id))
+            self._db.executemany('INSERT INTO postings VALUES (?, ?, ?)', [(term, doc_id, tf) for term, tf in terms.items()])
+        self._db.execute(f'PRAGMA user_version = {TOKENIZER_VERSION}')
+        self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    @staticmethod
+    def _document(task: ContestTask) -> str:
+        return '\n\n'.join(x for x in (task.name, task.main_description, task.in_description, task.out_description, task.comment) if x)
+
+    def add_tasks(self, contest_id: int, tasks: Iterable[ContestTask]):
+        db = self._connect()
+        known = dict(db.execute('SELECT task_id, fingerprint FROM docs WHERE contest_id = ?', (contest_id,)).fetchall())
+
+        changed = False
+        for idx, task in enumerate(tasks):
+            text = self._document(task)
+            fingerprint = hashlib.sha1(f'{idx}\0{text}'.encode('utf-8')).hexdigest()
+            if known.get(task.id) == fingerprint: # the usual case, statements almost never change
+                continue
+
+            terms = Counter(tokenize(text))
+            row = db.execute('SELECT id FROM docs WHERE contest_id = ? AND task_id = ?', (contest_id, task.id)).fetchone()
+            if row:
+                db.execute('DELETE FROM postings WHERE doc_id = ?', (row[0],))
+                db.execute('UPDATE docs SET idx = ?, name = ?, text = ?, length = ?, fingerprint = ? WHERE id = ?', (idx, task.name, text, sum(terms.values()), fingerprint, row[0]))
+                doc_id = row[0]
+            else:
+                doc_id = db.execute(
+                    'INSERT INTO docs (contest_id, task_id, idx, name, text, length, fingerprint) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (contest_id, task.id, idx, task.name, text, sum(terms.values()), fingerprint),
+                ).lastrowid
+            db.executemany('INSERT INTO postings VALUES (?, ?, ?)', [(term, doc_id, tf) for term, tf in terms.items()])
+            changed = True
+
+        if changed:
+            db.commit()
+
+    def search(self, query: str, limit: int = 10, contest_id: int | None = None) -> list[SearchResult]:
+        db = self._connect()
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        total, avgdl = db.execute('SELECT COUNT(*), AVG(length) FROM docs').fetchone()
+        if not total:
+            return []
+
+        scores: dict[int, float] = {}
+        for term in terms:
+            postings = db.execute('SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc_id WHERE p.term = ?', (term,)).fetchall()
+            if not postings:
+                continue
+
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf, length in postings:
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avgdl))
+
+        out = []
+        for doc_id, score in sorted(scores.items(), key=lambda x: -x[1]):
+            contest, task_id, idx, name, text = db.execute('SELECT contest_id, task_id, idx, name, text FROM docs WHERE id = ?', (doc_id,)).fetchone()
+            if contest_id is not None and contest != contest_id:
+                continue
+            out.append(SearchResult(contest, task_id, idx, name, text, score))
+            if len(out) == limit:
+                break
+        return out
+
+
+def snippet(text: str, query: str, width: int = 160) -> str:
+    # the paragraph/sentence sharing the most terms with the query, cut around the first match
+    terms = set(tokenize(query))
+    best, best_hits = '', -1
+    for part in re.split(r'\n+|(?<=[.!?])\s+', text):
+        hits = len(terms & set(tokenize(part)))
+        if hits > best_hits:
+            best, best_hits = part.strip(), hits
+
+    if len(best) <= width:
+        return best
+
+    positions = [m.start() for m in _WORD.finditer(best) if tokenize(m.group())[0] in terms]
+    start = max(0, (positions[0] if positions else 0) - width // 4)
+    # don't cut a $formula$ in half, the TeX renderer wouldn't know what to do with it
+    while best[:start].count('$') % 2:
+        start -= 1
+    end = min(len(best), start + width)
+    while best[start:end].count('$') % 2 and end < len(best):
+        end += 1
+    return ('…' if start else '') + best[start:end].strip() + ('…' if end < len(best) else '')
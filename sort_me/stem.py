@@ -0,0 +1,79 @@
+import functools
+
+# Snowball's Russian stemmer (https://snowballstem.org/algorithms/russian/stemmer.html), plus fleeting vowels:
+# Snowball leaves "отрезок" alone but cuts "отрезков" to "отрезк", so a stem ending in consonant + о/е + к/ц/л/н
+# loses the vowel. That happens to every stem the same way, so "отрезок", "отрезков" and "отрезками" all become
+# "отрезк", "дерево", "деревья" and "деревьев" become "дерев", "число" and "чисел" become "числ".
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (('в', 'вши', 'вшись'), ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'))
+ADJECTIVE = ('ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому',
+             'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею')
+PARTICIPLE = (('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+REFLEXIVE = ('ся', 'сь')
+VERB = (('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'ешь', 'нно'),
+        ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено',
+         'ят', 'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'))
+NOUN = ('а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием',
+        'ем', 'ам', 'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я')
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+
+def _region(word: str, start: int) -> int: # just past the first non-vowel that follows a vowel, from `start` on
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _cut(word: str, region: int, endings: tuple[str, ...], after_a: tuple[str, ...] = ()) -> str | None:
+    # the longest of `endings` + `after_a` that lies in the region, endings of `after_a` only count after а/я
+    longest = max((e for e in (*after_a, *endings) if word.endswith(e) and len(word) - len(e) >= region), key=len, default=None)
+    if longest is None:
+        return None
+    if longest in after_a and longest not in endings:
+        i = len(word) - len(longest) - 1
+        if i < region or word[i] not in 'ая':
+            return None
+    return word[:-len(longest)]
+
+
+@functools.lru_cache(maxsize=1 << 16) # statements share most of their vocabulary
+def stem(word: str) -> str:
+    word = word.replace('ё', 'е')
+    rv = next((i + 1 for i, c in enumerate(word) if c in VOWELS), len(word))
+    r2 = _region(word, _region(word, 0) - 1)
+
+    # step 1
+    out = _cut(word, rv, PERFECTIVE_GERUND[1], PERFECTIVE_GERUND[0])
+    if out is None:
+        out = _cut(word, rv, REFLEXIVE) or word
+        adjective = _cut(out, rv, ADJECTIVE)
+        if adjective is not None:
+            out = _cut(adjective, rv, PARTICIPLE[1], PARTICIPLE[0]) or adjective
+        else:
+            out = _cut(out, rv, VERB[1], VERB[0]) or _cut(out, rv, NOUN) or out
+
+    # step 2
+    if out.endswith('и') and len(out) - 1 >= rv:
+        out = out[:-1]
+
+    # step 3
+    out = _cut(out, r2, DERIVATIONAL) or out
+
+    # step 4
+    if out.endswith('нн') and len(out) - 2 >= rv:
+        out = out[:-1]
+    else:
+        superlative = _cut(out, rv, SUPERLATIVE)
+        if superlative is not None:
+            out = superlative[:-1] if superlative.endswith('нн') else superlative
+        elif out.endswith('ь') and len(out) - 1 >= rv:
+            out = out[:-1]
+
+    # fleeting vowel
+    if len(out) >= 4 and out[-3] not in VOWELS and out[-2] in 'ое' and out[-1] in 'кцлн':
+        out = out[:-2] + out[-1]
+    return out
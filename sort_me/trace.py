@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+
+from typing import Any
+
+
+class Span:
+    __slots__ = ('name', 'category', 'start', 'end', 'tid', 'args', '_tracer')
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: dict[str, Any]):
+        self._tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.tid = threading.get_ident()
+        self.start = 0.0
+        self.end = 0.0
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def add(self, key: str, value: int = 1): # counters like retries or bytes
+        self.args[key] = self.args.get(key, 0) + value
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *_):
+        self.end = time.perf_counter()
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self._tracer._record(self)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **_):
+        pass
+
+    def add(self, *_):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    enabled: bool
+    spans: list[Span]
+    _origin: float
+    _lock: threading.Lock
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset(False)
+
+    def reset(self, enabled: bool):
+        self.enabled = enabled
+        self.spans = []
+        self._origin = time.perf_counter()
+
+    def span(self, name: str, category: str = '', **args) -> Span | _NullSpan:
+        if not self.enabled: # this is all it costs when tracing is off
+            return _NULL_SPAN
+        return Span(self, name, category, args)
+
+    def _record(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> list[list]:
+        groups: dict[tuple[str, str], list[Span]] = {}
+        for span in self.spans:
+            groups.setdefault((span.category, span.name), []).append(span)
+
+        rows = []
+        for (category, name), spans in sorted(groups.items(), key=lambda x: -sum(s.duration for s in x[1])):
+            total = sum(span.duration for span in spans)
+            rows.append([
+                category,
+                name,
+                len(spans),
+                f'{total * 1000:.1f}',
+                f'{max(span.duration for span in spans) * 1000:.1f}',
+                sum(span.args.get('bytes', 0) for span in spans) or '',
+                sum(span.args.get('retries', 0) for span in spans) or '',
+                sum(span.args.get('connects', 0) for span in spans) or '',
+            ])
+        return rows
+
+    def chrome_trace(self) -> dict[str, Any]:
+        pid = os.getpid()
+        return {
+            'displayTimeUnit': 'ms',
+            'traceEvents': [{
+                'name': span.name,
+                'cat': span.category,
+                'ph': 'X',
+                'ts': (span.start - self._origin) * 1e6,
+                'dur': span.duration * 1e6,
+                'pid': pid,
+                'tid': span.tid,
+                'args': span.args,
+            } for span in sorted(self.spans, key=lambda s: s.start)],
+        }
+
+    def write_chrome_trace(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f, default=str)
+
+
+tracer = Tracer()
@@ -1,20 +1,23 @@
-from typing import Literal, TypeAlias, TypedDict
+from typing import Any, Literal, TypeAlias, TypedDict
 from dataclasses import dataclass
 
+from .exceptions import ModelDecodeError
+
 Lang: TypeAlias = Literal["python", "pypy", "c++", "golang", "haskell", "java", "rust", "c", "nodejs", "csharp"]
 
 _Json: TypeAlias = dict[str, "_Json"] | list["_Json"] | str | int | float | bool | None
 
 RequestMethod: TypeAlias = Literal['POST', 'GET']
 
-class FailedTestResponse(TypedDict):
-    n: int
-    verdict: Literal[1, 2, 3, 4, 5]
-    verdict_text: str
-    milliseconds: int
-    partial_score: int
+# NOTE: models are decoded field by field (no `cls(**data)`), so unknown keys are ignored, the input is never
+# mutated and a missing field raises ModelDecodeError. `to_dict` gives back the API shape, i.e.
+# `Model.from_dict(model.to_dict()) == model`, which is what goes into the on-disk caches.
+
+def _decode_error(cls: type, exc: Exception) -> ModelDecodeError:
+    return ModelDecodeError(f"Unable to decode {cls.__name__}: bad or missing field {exc}")
 
-class TelegramResponse(TypedDict):
+
+class TelegramResponse(TypedDict): # passed back to Sort-Me as is, never decoded
     id: int
     first_name: str
     last_name: str
@@ -23,69 +26,310 @@ class TelegramResponse(TypedDict):
     auth_date: int
     hash: str
 
-class SubmissionSubTask(TypedDict):
+
+@dataclass(slots=True)
+class FailedTest:
+    n: int
+    verdict: Literal[1, 2, 3, 4, 5]
+    verdict_text: str
+    milliseconds: int
+    partial_score: int
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]):
+        try:
+            return cls(data['n'], data['verdict'], data['verdict_text'], data['milliseconds'], data['partial_score'])
+        except (KeyError, TypeError) as exc:
+            raise _decode_error(cls, exc) from None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'n': self.n,
+            'verdict': self.verdict,
+            'verdict_text': self.verdict_text,
+            'milliseconds': self.milliseconds,
+            'partial_score': self.partial_score,
+        }
+
+
+@dataclass(slots=True)
+class SubmissionSubTask:
     skipped: bool
     points: int
-    failed_tests: list[FailedTestResponse] | None
     worst_time: int
+    failed_tests: list[FailedTest] | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]):
+        try:
+            failed_tests = data.get('failed_tests')
+            return cls(
+                data['skipped'],
+                data['points'],
+                data['worst_time'],
+                [FailedTest.from_dict(test) for test in failed_tests] if failed_tests is not None else None,
+            )
+        except (KeyError, TypeError) as exc:
+            raise _decode_error(cls, exc) from None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'skipped': self.skipped,
+            'points': self.points,
+            'worst_time': self.worst_time,
+            'failed_tests': [test.to_dict() for test in self.failed_tests] if self.failed_tests is not None else None,
+        }
+
 
-class BaseSubmission(TypedDict):
+@dataclass(slots=True)
+class BaseSubmission: # what the submission websocket sends while judging
     completed: bool
-    compiler_log: str
     shown_verdict: Literal[1, 2, 3, 4, 5]
     shown_verdict_text: str
-    total_points: int
-    subtasks: list[SubmissionSubTask] | None
+    compiler_log: str = ''
+    total_points: int | None = None
+    shown_test: int | None = None # only set for failed submissions
+    subtasks: list[SubmissionSubTask] | None = None
 
-class FailedSubmission(BaseSubmission):
-    shown_test: int
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]):
+        try:
+            subtasks = data.get('subtasks')
+            return cls(
+                data.get('completed', False),
+                data['shown_verdict'],
+                data['shown_verdict_text'],
+                data.get('compiler_log') or '',
+                data.get('total_points'),
+                data.get('shown_test'),
+                [SubmissionSubTask.from_dict(subtask) for subtask in subtasks] if subtasks is not None else None,
+            )
+        except (KeyError, TypeError) as exc:
+            raise _decode_error(cls, exc) from None
+
+    def to_dict(self) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            'completed': self.completed,
+            'shown_verdict': self.shown_verdict,
+            'shown_verdict_text': self.shown_verdict_text,
+            'compiler_log': self.compiler_log,
+            'subtasks': [subtask.to_dict() for subtask in self.subtasks] if self.subtasks is not None else None,
+        }
+        if self.total_points is not None:
+            out['total_points'] = self.total_points
+        if self.shown_test is not None:
+            out['shown_test'] = self.shown_test
+        return out
 
+
+@dataclass(slots=True)
 class VerboseSubmission(BaseSubmission):
-    code: str
-    submited_at: int
+    code: str = ''
+    submited_at: int = 0
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]):
+        base = BaseSubmission.from_dict(data)
+        try:
+            return cls(
+                base.completed,
+                base.shown_verdict,
+                base.shown_verdict_text,
+                base.compiler_log,
+                base.total_points,
+                base.shown_test,
+                base.subtasks,
+                data['code'],
+                data.get('submited_at', 0),
+            )
+        except (KeyError, TypeError) as exc:
+            raise _decode_error(cls, exc) from None
+
+    def to_dict(self) -> dict[str, Any]:
+        out = BaseSubmission.to_dict(self)
+        out['code'] = self.code
+        out['submited_at'] = self.submited_at
+        return out
+
 
-class ShortSubmissionBase(TypedDict):
+@dataclass(slots=True)
+class ShortSubmission: # an entry of the submission history
     id: int
     shown_verdict: int
     shown_verdict_text: str
+    total_points: int | None = None
+    shown_test: int | None = None
 
-class ShortSubmission(ShortSubmissionBase):
-    shown_test: int
-    total_points: int
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]):
+        try:
+            return cls(data['id'], data['shown_verdict'], data['shown_verdict_text'], data.get('total_points'), data.get('shown_test'))
+        except (KeyError, TypeError) as exc:
+            raise _decode_error(cls, exc) from None
 
-@dataclass
-class _BaseContest(TypedDict):
+    @classmethod
+    def from_list(cls, data: list[dict[str, Any]]) -> list["ShortSubmission"]:
+        try: # hot path for long histories, skips the per-item error handling
+            return [cls(x['id'], x['shown_verdict'], x['shown_verdict_text'], x.get('total_points'), x.get('shown_test')) for x in data]
+        except (KeyError, TypeError, AttributeError) as exc:
+            raise _decode_error(cls, exc) from None
+
+    def to_dict(self) -> dict[str, Any]:
+        out: dict[str, Any] = {'id': self.id, 'shown_verdict': self.shown_verdict, 'shown_verdict_text': self.shown_verdict_text}
+        if self.total_points is not None:
+            out['total_points'] = self.total_points
+        if self.shown_test is not None:
+            out['shown_test'] = self.shown_test
+        return out
+
+
+@dataclass(slots=True)
+class SubmissionHistory:
+    count: int
+    submissions: list[ShortSubmission]
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]):
+        try:
+            return cls(data['count'], ShortSubmission.from_list(data['submissions']))
+        except (KeyError, TypeError) as exc:
+            raise _decode_error(cls, exc) from None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {'count': self.count, 'submissions': [submission.to_dict() for submission in self.submissions]}
+
+
+@dataclass(slots=True)
+class ContestTableRow:
+    place: int
+    results: list[list[int]] # [points, time] per task, points == -1 means no attempts
+    sum: int
+    time: int
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]):
+        try:
+            return cls(data['place'], data['results'], data['sum'], data['time'])
+        except (KeyError, TypeError) as exc:
+            raise _decode_error(cls, exc) from None
+
+    @classmethod
+    def from_list(cls, data: list[dict[str, Any]]) -> list["ContestTableRow"]:
+        try:
+            return [cls(x['place'], x['results'], x['sum'], x['time']) for x in data]
+        except (KeyError, TypeError, AttributeError) as exc:
+            raise _decode_error(cls, exc) from None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {'place': self.place, 'results': self.results, 'sum': self.sum, 'time': self.time}
+
+
+@dataclass(slots=True)
+class _BaseContest:
     id: int
     name: str
     starts: int
     ends: int
 
+@dataclass(slots=True)
 class UpcomingContest(_BaseContest):
-    org_name: str
-    running: bool
-    registration_opened: bool
-    ended: bool
+    org_name: str = ''
+    running: bool = False
+    registration_opened: bool = False
+    ended: bool = False
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]):
+        try:
+            return cls(
+                data['id'],
+                data['name'],
+                data['starts'],
+                data['ends'],
+                data.get('org_name', ''),
+                data.get('running', False),
+                data.get('registration_opened', False),
+                data.get('ended', False),
+            )
+        except (KeyError, TypeError) as exc:
+            raise _decode_error(cls, exc) from None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'starts': self.starts,
+            'ends': self.ends,
+            'org_name': self.org_name,
+            'running': self.running,
+            'registration_opened': self.registration_opened,
+            'ended': self.ended,
+        }
+
+@dataclass(slots=True)
 class VerboseContestInfo(_BaseContest):
-    description: str
-    register_starts: int
-    register_ends: int
-    participants_count: int
-    rules: str
-    registered: bool
-    now: int
-    is_admin: bool
+    now: int = 0
+    description: str = ''
+    register_starts: int = 0
+    register_ends: int = 0
+    participants_count: int = 0
+    rules: str = ''
+    registered: bool = False
+    is_admin: bool = False
 
-@dataclass
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]):
+        try:
+            return cls(
+                data['id'],
+                data['name'],
+                data['starts'],
+                data['ends'],
+                data.get('now', 0), # the server clock, only `init --wait` needs it
+                data.get('description', ''),
+                data.get('register_starts', 0),
+                data.get('register_ends', 0),
+                data.get('participants_count', 0),
+                data.get('rules', ''),
+                data.get('registered', False),
+                data.get('is_admin', False),
+            )
+        except (KeyError, TypeError) as exc:
+            raise _decode_error(cls, exc) from None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'starts': self.starts,
+            'ends': self.ends,
+            'now': self.now,
+            'description': self.description,
+            'register_starts': self.register_starts,
+            'register_ends': self.register_ends,
+            'participants_count': self.participants_count,
+            'rules': self.rules,
+            'registered': self.registered,
+            'is_admin': self.is_admin,
+        }
+
+
+@dataclass(slots=True)
 class ContestTaskSample:
     input: str
     output: str
 
     @classmethod
-    def from_dict(cls, data):
-        return cls(input=data['in'], output=data.get('out') or '')
+    def from_dict(cls, data: dict[str, Any]):
+        try:
+            return cls(input=data['in'], output=data.get('out') or '')
+        except (KeyError, TypeError) as exc:
+            raise _decode_error(cls, exc) from None
 
-@dataclass
+    def to_dict(self) -> dict[str, Any]:
+        return {'in': self.input, 'out': self.output}
+
+@dataclass(slots=True)
 class ContestTaskSubtask:
     num: int
     points: int
@@ -94,7 +338,31 @@ class ContestTaskSubtask:
     tests_count: int
     necessary_subtasks: list[int] | None = None
 
-@dataclass
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]):
+        try:
+            return cls(
+                data['num'],
+                data['points'],
+                data['description'],
+                data['subtask_rating_system'],
+                data['tests_count'],
+                data.get('necessary_subtasks'),
+            )
+        except (KeyError, TypeError) as exc:
+            raise _decode_error(cls, exc) from None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'num': self.num,
+            'points': self.points,
+            'description': self.description,
+            'subtask_rating_system': self.subtask_rating_system,
+            'tests_count': self.tests_count,
+            'necessary_subtasks': self.necessary_subtasks,
+        }
+
+@dataclass(slots=True)
 class ContestTask:
     id: int
     name: str
@@ -118,22 +386,80 @@ class ContestTask:
     rating_system: str | None = None
 
     @classmethod
-    def from_dict(cls, data):
-        if 'subtasks' in data:
-            data['subtasks'] = [ContestTaskSubtask(**subtask) for subtask in data['subtasks']]
-        data['samples'] = [ContestTaskSample.from_dict(sample) for sample in data['samples']]
+    def from_dict(cls, data: dict[str, Any]):
+        try:
+            subtasks = data.get('subtasks')
+            return cls(
+                data['id'],
+                data['name'],
+                data['main_description'],
+                data['in_description'],
+                data['out_description'],
+                data['category'],
+                data['difficulty'],
+                data['solved_by'],
+                [ContestTaskSample.from_dict(sample) for sample in data['samples']],
+                data['on_moderation'],
+                data['visibility'],
+                data['is_admin'],
+                data['admins'],
+                data['tests_updated'],
+                data['time_limit_milliseconds'],
+                data['memory_limit_megabytes'],
+                data['rating_system_type'],
+                data.get('comment'),
+                [ContestTaskSubtask.from_dict(subtask) for subtask in subtasks] if subtasks is not None else None,
+                data.get('rating_system'),
+            )
+        except (KeyError, TypeError) as exc:
+            raise _decode_error(cls, exc) from None
 
-        return cls(**data)
+    def to_dict(self) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            'id': self.id,
+            'name': self.name,
+            'main_description': self.main_description,
+            'in_description': self.in_description,
+            'out_description': self.out_description,
+            'category': self.category,
+            'difficulty': self.difficulty,
+            'solved_by': self.solved_by,
+            'samples': [sample.to_dict() for sample in self.samples],
+            'on_moderation': self.on_moderation,
+            'visibility': self.visibility,
+            'is_admin': self.is_admin,
+            'admins': self.admins,
+            'tests_updated': self.tests_updated,
+            'time_limit_milliseconds': self.time_limit_milliseconds,
+            'memory_limit_megabytes': self.memory_limit_megabytes,
+            'rating_system_type': self.rating_system_type,
+        }
+        if self.comment is not None:
+            out['comment'] = self.comment
+        if self.subtasks is not None:
+            out['subtasks'] = [subtask.to_dict() for subtask in self.subtasks]
+        if self.rating_system is not None:
+            out['rating_system'] = self.rating_system
+        return out
 
-class SubmissionHistory(TypedDict):
-    count: int
-    submissions: list[ShortSubmission | ShortSubmissionBase]
 
-@dataclass
-class ContestInfoNew:
+@dataclass(slots=True)
+class ContestInfoNew: # what `sm contest` shows: getContestTasks without the statements, plus your row of the table
     name: str
     status: str
-    ends: int
+    ends: int # -1 if unknown
+    tasks: list[str] # task names
+    you: ContestTableRow
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]): # getContestTasks with `you` from getContestTable merged in
+        try:
+            return cls(data['name'], data['status'], data.get('ends', -1), [task['name'] for task in data['tasks']], ContestTableRow.from_dict(data['you']))
+        except (KeyError, TypeError) as exc:
+            raise _decode_error(cls, exc) from None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {'name': self.name, 'status': self.status, 'ends': self.ends, 'tasks': [{'name': name} for name in self.tasks], 'you': self.you.to_dict()}
 
 
 @dataclass
@@ -142,3 +468,4 @@ class Config:
     naming_convention: str
     phone: str
     template_path: str | None = None
+    daemon: bool = False